@@ -0,0 +1,67 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""比較各解析後端在新聞局頁面樣本上的解析速度及結果一致性"""
+
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from macau_news_monitor import PARSER_BACKENDS, available_parser_backends
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+
+def load_fixture(name: str) -> str:
+    with open(os.path.join(FIXTURES_DIR, name), 'r', encoding='utf-8') as f:
+        return f.read()
+
+
+"""重複解析同一文檔，返回每次解析的平均耗時（毫秒）及解析結果"""
+def time_parse(func, html: str, repeat: int):
+    result = func(html)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func(html)
+    elapsed = time.perf_counter() - start
+    return elapsed / repeat * 1000, result
+
+
+def bench_parsers(repeat: int):
+    listing_html = load_fixture('listing_page.html')
+    articles = [load_fixture(name) for name in sorted(os.listdir(FIXTURES_DIR)) if name.startswith('article_')]
+
+    print(f"樣本: 列表頁 {len(listing_html)} 字符，文章頁 {len(articles)} 篇，每項重複 {repeat} 次")
+    print()
+    print(f"{'後端':<12}{'列表頁 ms':>12}{'文章頁 ms':>12}{'加速比':>10}  結果")
+
+    baseline = None
+    for backend in available_parser_backends():
+        listing_func, article_func = PARSER_BACKENDS[backend]
+        listing_ms, rows = time_parse(listing_func, listing_html, repeat)
+        article_ms = 0.0
+        parts = []
+        for html in articles:
+            ms, result = time_parse(article_func, html, repeat)
+            article_ms += ms / len(articles)
+            parts.append(result)
+
+        total_ms = listing_ms + article_ms
+        if baseline is None:
+            baseline = (total_ms, rows, parts)
+        speedup = baseline[0] / total_ms
+        same = '一致' if (rows, parts) == baseline[1:] else '與 bs4 不一致'
+        print(f"{backend:<12}{listing_ms:>12.3f}{article_ms:>12.3f}{speedup:>9.1f}x  {len(rows)} 條 / {same}")
+
+    missing = set(PARSER_BACKENDS) - set(available_parser_backends())
+    if missing:
+        print()
+        print(f"未安裝: {', '.join(sorted(missing))}（pip install lxml selectolax）")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='解析後端基準測試')
+    parser.add_argument('--repeat', type=int, default=50, help='每個樣本重複解析次數')
+    bench_parsers(parser.parse_args().repeat)
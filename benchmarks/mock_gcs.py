@@ -0,0 +1,166 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""本地模擬新聞局網站：按 fixtures 樣本提供列表頁（含 nextPage 分頁）及文章頁，可設置響應延遲；
+請求頭接受 gzip 時壓縮響應體"""
+
+import os
+import re
+import gzip
+import time
+import zlib
+import threading
+import argparse
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+ROW_PATTERN = re.compile(r'<tr class="infiniteItem".*?</tr>', re.S)
+MACAU_TZ = timezone(timedelta(hours=8))
+
+
+def load_fixture(name: str) -> str:
+    with open(os.path.join(FIXTURES_DIR, name), 'r', encoding='utf-8') as f:
+        return f.read()
+
+
+"""模擬服務器：每頁複用樣本中的新聞行，按頁碼改寫文章編號和發佈時間"""
+class MockGCSServer:
+    def __init__(self, pages: int = 10, latency: float = 0.0, item_interval_minutes: int = 20,
+                 host: str = '127.0.0.1', port: int = 0):
+        self.pages = pages
+        self.latency = latency
+        self.item_interval = timedelta(minutes=item_interval_minutes)
+        self.started_at = datetime.now(MACAU_TZ)
+        self.stats = {'listing': 0, 'article': 0, 'not_modified': 0, 'bytes': 0}
+        self._lock = threading.Lock()
+
+        listing = load_fixture('listing_page.html')
+        rows = ROW_PATTERN.findall(listing)
+        self.rows_per_page = len(rows)
+        self._row_templates = rows
+        self._listing_head = listing[:listing.index(rows[0])]
+        self._listing_tail = listing[listing.index(rows[-1]) + len(rows[-1]):]
+        self._articles = [load_fixture(name) for name in sorted(os.listdir(FIXTURES_DIR))
+                          if name.startswith('article_')]
+
+        self._httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def news_url(self) -> str:
+        return f"{self.base_url}/list/zh-hant/news/"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name='mock-gcs', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def reset_stats(self):
+        with self._lock:
+            for key in self.stats:
+                self.stats[key] = 0
+
+    def _count(self, key: str, size: int = 0):
+        with self._lock:
+            self.stats[key] += 1
+            self.stats['bytes'] += size
+
+    """第 page 頁的 HTML；超過總頁數時返回空表格"""
+    def listing_html(self, page: int) -> str:
+        rows = []
+        if page < self.pages:
+            for i, row in enumerate(self._row_templates):
+                index = page * self.rows_per_page + i
+                published = self.started_at - self.item_interval * index
+                row = re.sub(r'/detail/zh-hant/N\w+?;', f'/detail/zh-hant/N{index:06d};', row)
+                row = re.sub(r'datetime="[^"]+"', f'datetime="{published.strftime("%Y-%m-%dT%H:%M:%S+0800")}"', row)
+                rows.append(row)
+        return self._listing_head + '\n'.join(rows) + self._listing_tail
+
+    def article_html(self, index: int) -> str:
+        return self._articles[index % len(self._articles)]
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                if server.latency:
+                    time.sleep(server.latency)
+
+                if self.path.startswith('/list/'):
+                    match = re.search(r'nextPage=(\d+)', self.path)
+                    body = server.listing_html(int(match.group(1)) if match else 0).encode('utf-8')
+                    etag = f'"list-{zlib.crc32(body):08x}"'
+                    if self.headers.get('If-None-Match') == etag:
+                        server._count('not_modified')
+                        self._send(304, b'', {'ETag': etag})
+                        return
+                    body, headers = self._encode(body, {'ETag': etag})
+                    server._count('listing', len(body))
+                    self._send(200, body, headers)
+                    return
+
+                match = re.match(r'/detail/zh-hant/N(\d+)', self.path)
+                if match:
+                    etag = f'"gcs-{match.group(1)}"'
+                    if self.headers.get('If-None-Match') == etag:
+                        server._count('not_modified')
+                        self._send(304, b'', {'ETag': etag})
+                        return
+                    body = server.article_html(int(match.group(1))).encode('utf-8')
+                    body, headers = self._encode(body, {'ETag': etag})
+                    server._count('article', len(body))
+                    self._send(200, body, headers)
+                    return
+
+                self._send(404, b'not found')
+
+            # 客戶端接受 gzip 時壓縮響應體（統計的是傳輸字節數）
+            def _encode(self, body: bytes, headers: dict):
+                if 'gzip' not in self.headers.get('Accept-Encoding', ''):
+                    return body, headers
+                return gzip.compress(body, compresslevel=6), dict(headers, **{'Content-Encoding': 'gzip', 'Vary': 'Accept-Encoding'})
+
+            def _send(self, status: int, body: bytes, headers: dict = None):
+                self.send_response(status)
+                self.send_header('Content-Type', 'text/html;charset=UTF-8')
+                self.send_header('Content-Length', str(len(body)))
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+                if body:
+                    self.wfile.write(body)
+
+        return Handler
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='本地模擬新聞局網站')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--pages', type=int, default=10, help='列表總頁數')
+    parser.add_argument('--latency', type=float, default=0.0, help='每個請求的響應延遲（秒）')
+    args = parser.parse_args()
+
+    mock = MockGCSServer(pages=args.pages, latency=args.latency, port=args.port).start()
+    print(f"模擬新聞局網站已啓動: {mock.news_url}  (Ctrl+C 結束)")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        mock.stop()
@@ -0,0 +1,197 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""端到端基準測試：在本地模擬網站和 SMTP 接收端上運行監控器各階段，報告耗時、請求速率、峰值內存和解析 CPU 時間"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from macau_news_monitor import MacauNewsMonitorEmail
+from mock_gcs import MockGCSServer
+from smtp_sink import SmtpSink
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+
+"""進程峰值常駐內存（MB），無法獲取時返回 None"""
+def peak_rss_mb():
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux 單位爲 KB，macOS 爲字節
+        return peak / 1024 / 1024 if sys.platform == 'darwin' else peak / 1024
+    if psutil is not None:
+        info = psutil.Process().memory_info()
+        return getattr(info, 'peak_wset', info.rss) / 1024 / 1024
+    return None
+
+
+"""統計所有線程中 HTML 解析消耗的 CPU 時間"""
+class ParseTimer:
+    def __init__(self, monitor: MacauNewsMonitorEmail):
+        self.seconds = 0.0
+        self._lock = threading.Lock()
+        parse = monitor._parse_with_backend
+
+        def timed_parse(kind, html):
+            start = time.thread_time()
+            try:
+                return parse(kind, html)
+            finally:
+                with self._lock:
+                    self.seconds += time.thread_time() - start
+
+        monitor._parse_with_backend = timed_parse
+
+    def take(self) -> float:
+        with self._lock:
+            seconds, self.seconds = self.seconds, 0.0
+        return seconds
+
+
+class Benchmark:
+    def __init__(self, monitor, mock, sink, parse_timer):
+        self.monitor = monitor
+        self.mock = mock
+        self.sink = sink
+        self.parse_timer = parse_timer
+        self.results = []
+
+    """執行一個階段並記錄指標"""
+    def stage(self, name: str, func):
+        self.mock.reset_stats()
+        self.parse_timer.take()
+        start = time.perf_counter()
+        result = func()
+        wall = time.perf_counter() - start
+        stats = dict(self.mock.stats)
+        requests = stats['listing'] + stats['article'] + stats['not_modified']
+        self.results.append({
+            'stage': name,
+            'wall_seconds': round(wall, 4),
+            'requests': requests,
+            'requests_per_second': round(requests / wall, 1) if requests and wall else 0,
+            'bytes_downloaded': stats['bytes'],
+            'parse_cpu_seconds': round(self.parse_timer.take(), 4),
+            'peak_rss_mb': round(peak_rss_mb(), 1) if peak_rss_mb() is not None else None
+        })
+        return result
+
+
+def write_config(args, mock: MockGCSServer, sink: SmtpSink) -> str:
+    config = {
+        'smtp_server': '127.0.0.1',
+        'smtp_port': sink.port,
+        'smtp_starttls': False,
+        'smtp_username': 'bench',
+        'smtp_password': 'bench',
+        'email_from': 'bench@localhost',
+        'email_to': ['bench@localhost'],
+        'keywords': ['軍團菌', '退伍軍人症', 'Legionella'],
+        'news_url': mock.news_url,
+        'max_pages': args.pages,
+        'days_to_check': 30,
+        'crawl_mode': 'full',
+        'check_content': True,
+        'concurrent_requests': args.concurrency,
+        'async_concurrency': args.concurrency,
+        'per_host_rate': args.per_host_rate,
+        'engine': args.engine,
+        'parser_backend': args.parser,
+        'parse_processes': args.parse_processes,
+        'http2': args.http2,
+        'article_cache_enabled': args.cache,
+        'log_level': 'WARNING'
+    }
+    with open('config.json', 'w', encoding='utf-8') as f:
+        json.dump(config, f, ensure_ascii=False, indent=2)
+    return 'config.json'
+
+
+def run_benchmark(args) -> list:
+    mock = MockGCSServer(pages=args.pages, latency=args.latency).start()
+    sink = SmtpSink().start()
+    original_dir = os.getcwd()
+
+    with tempfile.TemporaryDirectory(prefix='gcs-bench-') as work_dir:
+        os.chdir(work_dir)
+        try:
+            monitor = MacauNewsMonitorEmail(write_config(args, mock, sink))
+            bench = Benchmark(monitor, mock, sink, ParseTimer(monitor))
+
+            if args.engine == 'async':
+                news_list = bench.stage('crawl_async', monitor.crawl_async)
+            else:
+                news_list = bench.stage('fetch_all_pages', monitor.fetch_all_pages)
+                bench.stage('fetch_contents_concurrent', lambda: monitor.fetch_contents_concurrent(news_list))
+
+            matched = bench.stage('filter_news', lambda: monitor.filter_news(news_list))
+            bench.stage('_build_email_html', lambda: monitor._build_email_html(matched))
+            bench.stage('send_email', lambda: monitor.send_email(matched))
+
+            def pipeline():
+                first = None
+                start = time.perf_counter()
+                for _ in monitor.iter_news():
+                    if first is None:
+                        first = time.perf_counter() - start
+                return first
+
+            first_item = bench.stage('pipeline (iter_news)', pipeline)
+            transport = monitor.transport.stats()
+            monitor.delivery.close()
+        finally:
+            os.chdir(original_dir)
+
+    mock.stop()
+    sink.stop()
+
+    print(f"引擎: {args.engine}  解析: {monitor.parser_backend}  解析進程: {args.parse_processes}  併發: {args.concurrency}  "
+          f"頁數: {args.pages}  延遲: {args.latency * 1000:.0f}ms  緩存: {'開' if args.cache else '關'}")
+    print(f"新聞: {len(news_list)} 條，匹配: {len(matched)} 條，SMTP 接收: {sink.messages} 封 / {sink.connections} 個連接")
+    if first_item is not None:
+        print(f"流水線首條新聞耗時: {first_item:.3f}s")
+    for client, counts in transport.items():
+        print(f"HTTP 連接 [{client}]: {counts['requests']} 個請求 / {counts['connections']} 個新建連接（複用率 {counts['reuse_ratio']:.0%}）")
+    print()
+    print(f"{'階段':<28}{'耗時 s':>10}{'請求':>8}{'請求/s':>10}{'下載 KB':>10}{'解析 CPU s':>12}{'峰值 RSS MB':>13}")
+    for row in bench.results:
+        rss = f"{row['peak_rss_mb']:.1f}" if row['peak_rss_mb'] is not None else 'N/A'
+        print(f"{row['stage']:<28}{row['wall_seconds']:>10.3f}{row['requests']:>8}{row['requests_per_second']:>10.1f}"
+              f"{row['bytes_downloaded'] / 1024:>10.1f}{row['parse_cpu_seconds']:>12.3f}{rss:>13}")
+
+    return bench.results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='監控器端到端基準測試（本地模擬網站）')
+    parser.add_argument('--engine', choices=['threads', 'async'], default='threads')
+    parser.add_argument('--parser', default='bs4', help='解析後端: bs4 / lxml / selectolax / auto')
+    parser.add_argument('--pages', type=int, default=5, help='列表頁數（每頁 10 條）')
+    parser.add_argument('--latency', type=float, default=0.05, help='模擬網站每個請求的延遲（秒）')
+    parser.add_argument('--concurrency', type=int, default=5, help='內文抓取併發數')
+    parser.add_argument('--parse-processes', type=int, default=0, help='內文解析進程數（0 爲在抓取線程中解析）')
+    parser.add_argument('--http2', action='store_true', help='經 httpx 使用 HTTP/2（需安裝 httpx[http2]）')
+    parser.add_argument('--per-host-rate', type=float, default=0, help='異步引擎每秒請求上限（0 爲不限）')
+    parser.add_argument('--cache', action='store_true', help='啓用內文緩存')
+    parser.add_argument('--json', help='把結果寫入 JSON 文件')
+    args = parser.parse_args()
+
+    results = run_benchmark(args)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'args': vars(args), 'stages': results}, f, ensure_ascii=False, indent=2)
@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""本地 SMTP 接收端：接受任意登錄和郵件並只做計數，用於在不連接真實郵件服務器的情況下測試發送流程"""
+
+import threading
+import socketserver
+
+
+"""最小 SMTP 服務器（不支持 STARTTLS，客戶端需設置 smtp_starttls: false）"""
+class SmtpSink:
+    def __init__(self, host: str = '127.0.0.1', port: int = 0):
+        self.messages = 0
+        self.connections = 0
+        self.bytes = 0
+        self._lock = threading.Lock()
+        self._server = socketserver.ThreadingTCPServer((host, port), self._make_handler())
+        self._server.daemon_threads = True
+
+    @property
+    def port(self) -> int:
+        return self._server.server_address[1]
+
+    def start(self):
+        threading.Thread(target=self._server.serve_forever, name='smtp-sink', daemon=True).start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def reset_stats(self):
+        with self._lock:
+            self.messages = self.connections = self.bytes = 0
+
+    def _make_handler(self):
+        sink = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def reply(self, line: str):
+                self.wfile.write((line + '\r\n').encode('ascii'))
+
+            def handle(self):
+                with sink._lock:
+                    sink.connections += 1
+                self.reply('220 smtp-sink ready')
+                in_data = False
+                size = 0
+                for raw in self.rfile:
+                    line = raw.rstrip(b'\r\n')
+                    if in_data:
+                        if line == b'.':
+                            in_data = False
+                            with sink._lock:
+                                sink.messages += 1
+                                sink.bytes += size
+                            self.reply('250 OK queued')
+                        else:
+                            size += len(raw)
+                        continue
+
+                    command = line[:4].upper()
+                    if command == b'EHLO':
+                        self.reply('250-smtp-sink')
+                        self.reply('250 AUTH PLAIN LOGIN')
+                    elif command == b'HELO':
+                        self.reply('250 smtp-sink')
+                    elif command == b'AUTH':
+                        self.reply('235 Authentication successful')
+                    elif command == b'DATA':
+                        in_data = True
+                        size = 0
+                        self.reply('354 End data with <CR><LF>.<CR><LF>')
+                    elif command == b'QUIT':
+                        self.reply('221 Bye')
+                        return
+                    else:
+                        self.reply('250 OK')
+
+        return Handler
@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""本地 Webhook 接收端：記錄收到的 JSON 通知，可設置響應延遲及前若干次請求返回錯誤，用於測試 webhook 渠道的超時及重試"""
+
+import json
+import time
+import threading
+import argparse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+"""最小 Webhook 服務器：POST 任意路徑，請求體須爲 JSON"""
+class WebhookSink:
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, latency: float = 0.0,
+                 fail_first: int = 0, fail_status: int = 503):
+        self.latency = latency
+        self.fail_first = fail_first
+        self.fail_status = fail_status
+        self.payloads = []
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self._httpd.daemon_threads = True
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/hook"
+
+    def start(self):
+        threading.Thread(target=self._httpd.serve_forever, name='webhook-sink', daemon=True).start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def reset_stats(self):
+        with self._lock:
+            self.payloads = []
+            self.requests = 0
+
+    def _make_handler(self):
+        sink = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, format, *args):
+                pass
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                if sink.latency:
+                    time.sleep(sink.latency)
+                with sink._lock:
+                    sink.requests += 1
+                    failing = sink.requests <= sink.fail_first
+                    if not failing:
+                        sink.payloads.append(json.loads(body))
+                self.send_response(sink.fail_status if failing else 204)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+
+        return Handler
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='本地 Webhook 接收端')
+    parser.add_argument('--port', type=int, default=8766)
+    parser.add_argument('--latency', type=float, default=0.0, help='每個請求的響應延遲（秒）')
+    args = parser.parse_args()
+    sink = WebhookSink(port=args.port, latency=args.latency).start()
+    print(f"Webhook 接收端已啓動: {sink.url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        sink.stop()
@@ -5,38 +5,1807 @@ import os
 import sys
 import json
 import logging
+import atexit
 import argparse
 import time
+import random
+import uuid
 import smtplib
 import ssl
+import sqlite3
+import threading
+import asyncio
+import queue
+import bisect
+import copy
+from contextlib import contextmanager
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler, TimedRotatingFileHandler
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from datetime import datetime, timedelta, timezone
-from typing import List, Dict, Set, Optional
-from urllib.parse import urljoin
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import math
+import hashlib
+from html import escape
+from string import Template
+from typing import List, Dict, Set, Tuple, Optional, Iterator, Callable
+from urllib.parse import urljoin, urlparse
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from email.header import Header
+from email.utils import parsedate_to_datetime
 
 import requests
+from requests.adapters import BaseAdapter, HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+from urllib3.util.retry import Retry
 from bs4 import BeautifulSoup
 
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+try:
+    import brotli
+except ImportError:
+    try:
+        import brotlicffi as brotli
+    except ImportError:
+        brotli = None
+
+try:
+    import lxml.html
+except ImportError:
+    lxml = None
+
+try:
+    from selectolax.lexbor import LexborHTMLParser as SelectolaxParser
+except ImportError:
+    try:
+        from selectolax.parser import HTMLParser as SelectolaxParser
+    except ImportError:
+        SelectolaxParser = None
+
+
+# ---------------------------------------------------------------------------
+# 解析後端：列表頁返回 (標題, 鏈接, datetime 屬性) 元組，文章頁返回內文段落列表
+# bs4 爲純 Python 回退實現，lxml / selectolax 爲可選的 C 實現，只做定向抽取
+# ---------------------------------------------------------------------------
+
+"""BeautifulSoup：解析列表頁"""
+def _listing_rows_bs4(html: str) -> List[Tuple[str, str, Optional[str]]]:
+    rows = []
+    for item in BeautifulSoup(html, 'html.parser').find_all('tr', class_='infiniteItem'):
+        h5 = item.find('h5')
+        link_tag = item.find('a', href=lambda x: x and '/detail/' in x)
+        if not h5 or not link_tag:
+            continue
+        time_tag = item.find('time', class_='render_timeago_css')
+        rows.append((h5.get_text(strip=True), link_tag.get('href', ''), time_tag.get('datetime') if time_tag else None))
+    return rows
+
+
+"""BeautifulSoup：抽取文章內文段落"""
+def _article_parts_bs4(html: str) -> List[str]:
+    soup = BeautifulSoup(html, 'html.parser')
+    
+    content_parts = []
+    
+    for p in soup.find_all('p'):
+        text = p.get_text(strip=True)
+        if len(text) > 20 and not text.startswith('跳至'):
+            content_parts.append(text)
+    
+    if not content_parts:
+        main_content = soup.find('main') or soup.find('article') or soup.find('div', class_='content')
+        if main_content:
+            content_parts.append(main_content.get_text(separator=' ', strip=True))
+    
+    if not content_parts:
+        og_desc = soup.find('meta', property='og:description')
+        if og_desc and og_desc.get('content'):
+            content_parts.append(og_desc.get('content'))
+    
+    return content_parts
+
+
+_XPATH_CLASS = 'contains(concat(" ", normalize-space(@class), " "), " {} ")'
+
+
+"""lxml：解析列表頁"""
+def _listing_rows_lxml(html: str) -> List[Tuple[str, str, Optional[str]]]:
+    if not html.strip():
+        return []
+    rows = []
+    doc = lxml.html.fromstring(html)
+    for item in doc.xpath(f'//tr[{_XPATH_CLASS.format("infiniteItem")}]'):
+        h5 = item.find('.//h5')
+        links = item.xpath('.//a[contains(@href, "/detail/")]')
+        if h5 is None or not links:
+            continue
+        datetimes = item.xpath(f'.//time[{_XPATH_CLASS.format("render_timeago_css")}]/@datetime')
+        title = ''.join(text.strip() for text in h5.itertext())
+        rows.append((title, links[0].get('href', ''), datetimes[0] if datetimes else None))
+    return rows
+
+
+"""lxml：抽取文章內文段落"""
+def _article_parts_lxml(html: str) -> List[str]:
+    if not html.strip():
+        return []
+    doc = lxml.html.fromstring(html)
+    
+    content_parts = []
+    
+    for p in doc.iter('p'):
+        text = ''.join(text.strip() for text in p.itertext())
+        if len(text) > 20 and not text.startswith('跳至'):
+            content_parts.append(text)
+    
+    if not content_parts:
+        main_content = doc.xpath(f'(//main | //article | //div[{_XPATH_CLASS.format("content")}])[1]')
+        if main_content:
+            content_parts.append(' '.join(t.strip() for t in main_content[0].itertext() if t.strip()))
+    
+    if not content_parts:
+        og_desc = doc.xpath('//meta[@property="og:description"]/@content')
+        if og_desc and og_desc[0]:
+            content_parts.append(og_desc[0])
+    
+    return content_parts
+
+
+"""selectolax：解析列表頁"""
+def _listing_rows_selectolax(html: str) -> List[Tuple[str, str, Optional[str]]]:
+    rows = []
+    for item in SelectolaxParser(html).css('tr.infiniteItem'):
+        h5 = item.css_first('h5')
+        link_tag = item.css_first('a[href*="/detail/"]')
+        if h5 is None or link_tag is None:
+            continue
+        time_tag = item.css_first('time.render_timeago_css')
+        datetime_str = time_tag.attributes.get('datetime') if time_tag is not None else None
+        rows.append((h5.text(strip=True), link_tag.attributes.get('href') or '', datetime_str))
+    return rows
+
+
+"""selectolax：抽取文章內文段落"""
+def _article_parts_selectolax(html: str) -> List[str]:
+    tree = SelectolaxParser(html)
+    
+    content_parts = []
+    
+    for p in tree.css('p'):
+        text = p.text(strip=True)
+        if len(text) > 20 and not text.startswith('跳至'):
+            content_parts.append(text)
+    
+    if not content_parts:
+        main_content = tree.css_first('main') or tree.css_first('article') or tree.css_first('div.content')
+        if main_content is not None:
+            content_parts.append(main_content.text(separator=' ', strip=True))
+    
+    if not content_parts:
+        og_desc = tree.css_first('meta[property="og:description"]')
+        if og_desc is not None and og_desc.attributes.get('content'):
+            content_parts.append(og_desc.attributes['content'])
+    
+    return content_parts
+
+
+PARSER_BACKENDS = {
+    'bs4': (_listing_rows_bs4, _article_parts_bs4),
+    'lxml': (_listing_rows_lxml, _article_parts_lxml),
+    'selectolax': (_listing_rows_selectolax, _article_parts_selectolax),
+}
+
+
+"""返回當前環境中可用的解析後端名稱"""
+def available_parser_backends() -> List[str]:
+    backends = ['bs4']
+    if lxml is not None:
+        backends.append('lxml')
+    if SelectolaxParser is not None:
+        backends.append('selectolax')
+    return backends
+
+
+"""從文章頁中抽取內文（解析進程池的任務，須爲模塊級函數）：data 爲字節時先解析 [start:end) 正文區域，
+區域中沒有可用段落時解析整頁；快速後端出錯時回退到 BeautifulSoup"""
+def extract_article_content(data, start: Optional[int] = None, end: Optional[int] = None, backend: str = 'bs4') -> str:
+    def extract(html: str) -> str:
+        try:
+            parts = PARSER_BACKENDS[backend][1](html)
+        except Exception:
+            parts = PARSER_BACKENDS['bs4'][1](html)
+        return ' '.join(' '.join(parts).split())
+    
+    if isinstance(data, str):
+        return extract(data)
+    if start is not None:
+        content = extract(data[start:end].decode('utf-8', errors='replace'))
+        if content:
+            return content
+    return extract(data.decode('utf-8', errors='replace'))
+
+"""異步按主機限速器：同一主機的相鄰請求至少間隔 1/rate 秒"""
+class AsyncHostRateLimiter:
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next_slot = {}
+
+    async def wait(self, host: str):
+        if not self.interval:
+            return
+        now = asyncio.get_running_loop().time()
+        slot = max(now, self._next_slot.get(host, now))
+        self._next_slot[host] = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+    
+    """暫停對該主機的請求（用於遵守 Retry-After）"""
+    def pause(self, host: str, seconds: float):
+        now = asyncio.get_running_loop().time()
+        self._next_slot[host] = max(self._next_slot.get(host, now), now + seconds)
+
+
+"""是否爲可重試的 HTTP 狀態（限流或服務器錯誤）"""
+def _is_retryable_status(status: int) -> bool:
+    return status == 429 or status >= 500
+
+
+"""解析 Retry-After 響應頭（秒數或 HTTP 日期），返回等待秒數"""
+def _parse_retry_after(value: Optional[str], limit: float = 300) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        seconds = float(value)
+    except ValueError:
+        try:
+            seconds = (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds()
+        except (TypeError, ValueError):
+            return None
+    return min(max(seconds, 0.0), limit)
+
+
+"""自適應併發控制（AIMD）：響應延遲低於目標時逐步加性提高併發上限，
+遇到 429/5xx/超時時減半，並在 Retry-After 指定的時間內暫停所有請求"""
+class AdaptiveConcurrency:
+    def __init__(self, initial: int, max_limit: int, min_limit: int = 1, latency_target: float = 2.0):
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.limit = float(min(max(initial, self.min_limit), self.max_limit))
+        self.latency_target = latency_target
+        self._inflight = 0
+        self._resume_at = 0.0
+        self._last_decrease = 0.0
+        self._cond = threading.Condition()
+    
+    def __enter__(self):
+        self.acquire()
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.release()
+    
+    """等待暫停結束及空閒名額"""
+    def acquire(self):
+        with self._cond:
+            while True:
+                wait = self._resume_at - time.monotonic()
+                if wait > 0:
+                    self._cond.wait(wait)
+                elif self._inflight < int(self.limit):
+                    break
+                else:
+                    self._cond.wait()
+            self._inflight += 1
+    
+    def release(self):
+        with self._cond:
+            self._inflight -= 1
+            self._cond.notify_all()
+    
+    """請求成功：延遲未超過目標時上限加 1/limit（約每輪加 1），超過時輕微下調"""
+    def on_success(self, latency: float):
+        with self._cond:
+            if latency <= self.latency_target:
+                self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+            else:
+                self.limit = max(self.min_limit, self.limit * 0.9)
+            self._cond.notify_all()
+    
+    """限流、服務器錯誤或超時：上限減半（1 秒內只減一次），有 Retry-After 時暫停所有請求"""
+    def on_overload(self, retry_after: Optional[float] = None):
+        now = time.monotonic()
+        with self._cond:
+            if now - self._last_decrease >= 1.0:
+                self.limit = max(self.min_limit, self.limit / 2)
+                self._last_decrease = now
+            if retry_after:
+                self._resume_at = max(self._resume_at, now + retry_after)
+
+
+"""增量讀取文章頁：定位正文區域（<main> / <article>），讀到區域結束標記或字節上限即可停止"""
+class ArticleStreamReader:
+    START_MARKERS = (b'<main', b'<article')
+    END_MARKERS = (b'</article>', b'</main>')
+    # 正文結束後最多再讀取的字節數：頁尾較短時讀完整個響應，連接可放回連接池複用
+    DRAIN_LIMIT = 64 * 1024
+    
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.buffer = bytearray()
+        self.start = None
+        self.end = None
+        self.truncated = False
+    
+    """追加一段響應數據，返回是否可以停止讀取"""
+    def feed(self, chunk: bytes) -> bool:
+        # 標記可能跨越兩段數據，從上一段末尾稍前處開始查找
+        scan_from = max(0, len(self.buffer) - 16)
+        self.buffer += chunk
+        if self.start is None:
+            found = [pos for pos in (self.buffer.find(marker, scan_from) for marker in self.START_MARKERS) if pos >= 0]
+            if found:
+                self.start = min(found)
+        if self.start is not None:
+            scan_from = max(scan_from, self.start)
+            found = [pos + len(marker) for marker in self.END_MARKERS
+                     for pos in (self.buffer.find(marker, scan_from),) if pos >= 0]
+            if found:
+                self.end = min(found)
+                return True
+        if len(self.buffer) >= self.max_bytes:
+            self.truncated = True
+            return True
+        return False
+    
+    """讀取結果：complete（讀到正文結束）、truncated（達到字節上限）、no_region（未找到正文區域）、unterminated（響應在正文結束前已完）"""
+    @property
+    def status(self) -> str:
+        if self.end is not None:
+            return 'complete'
+        if self.truncated:
+            return 'truncated'
+        return 'no_region' if self.start is None else 'unterminated'
+    
+    """正文區域 HTML；未找到正文區域時爲已讀取的全部內容"""
+    def region(self) -> str:
+        data = self.buffer[:self.max_bytes]
+        if self.start is not None:
+            data = data[self.start:self.end]
+        return bytes(data).decode('utf-8', errors='replace')
+    
+    """已讀取的全部內容（正文區域中沒有可用段落時用於回退到 og:description 等）"""
+    def document(self) -> str:
+        return bytes(self.buffer[:self.max_bytes]).decode('utf-8', errors='replace')
+
+
+"""多模式關鍵詞匹配器（Aho–Corasick 自動機）：構建一次，每段文本只需掃描一遍"""
+class KeywordMatcher:
+    def __init__(self, keywords: List[str]):
+        self.keywords = list(dict.fromkeys(kw for kw in keywords if kw))
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [[]]
+        
+        for kw in self.keywords:
+            state = 0
+            for ch in kw.lower():
+                next_state = self._goto[state].get(ch)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][ch] = next_state
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                state = next_state
+            self._out[state].append((kw, len(kw.lower())))
+        
+        # 廣度優先構建失配指針，並把失配狀態的輸出合併到當前狀態
+        pending = deque(self._goto[0].values())
+        while pending:
+            state = pending.popleft()
+            for ch, next_state in self._goto[state].items():
+                pending.append(next_state)
+                fail = self._fail[state]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[next_state] = self._goto[fail].get(ch, 0)
+                self._out[next_state] = self._out[next_state] + self._out[self._fail[next_state]]
+
+    """掃描文本（不區分大小寫），返回 {關鍵詞: [起始位置, ...]}，位置爲小寫化文本中的字符偏移"""
+    def search(self, text: str) -> Dict[str, List[int]]:
+        goto, fail, out = self._goto, self._fail, self._out
+        hits = {}
+        state = 0
+        for i, ch in enumerate(text.lower()):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            for kw, length in out[state]:
+                hits.setdefault(kw, []).append(i - length + 1)
+        return hits
+
+
+"""單條新聞：以 __slots__ 保存字段，省去每條新聞的屬性字典；URL 經 sys.intern 駐留，
+列表頁、檢查點及已發送記錄鍵共用同一字符串。content 爲 None 表示尚未抓取內文"""
+class NewsItem:
+    __slots__ = ('title', 'url', 'publish_time', 'content', 'source', 'content_failed', 'matched_keywords', 'updated_for')
+    
+    def __init__(self, title: str, url: str, publish_time: Optional[datetime] = None,
+                 content: Optional[str] = None, source: Optional[str] = None):
+        self.title = title
+        self.url = sys.intern(url)
+        self.publish_time = publish_time
+        self.content = content
+        self.source = source
+        # 內文抓取重試用盡（本輪只按標題匹配）
+        self.content_failed = False
+        # 命中的關鍵詞及其在「標題 內文」中的位置
+        self.matched_keywords: Optional[Dict[str, List[int]]] = None
+        # 按訂閱記錄的內容更新後新出現的關鍵詞
+        self.updated_for: Optional[Dict[str, List[str]]] = None
+    
+    def __repr__(self) -> str:
+        return f"NewsItem({self.title!r}, {self.url!r})"
+
+
+"""新聞內容指紋：標題及內文規範化（合併空白、小寫）後的 64 位 BLAKE2b 摘要"""
+def content_fingerprint(title: str, content: Optional[str]) -> str:
+    text = ' '.join(f"{title} {content or ''}".split()).lower()
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=8).hexdigest()
+
+
+"""列表首頁指紋：按順序的文章 URL 及標題的 64 位 BLAKE2b 摘要"""
+def listing_fingerprint(news_list: List[NewsItem]) -> str:
+    digest = hashlib.blake2b(digest_size=8)
+    for news in news_list:
+        digest.update(f"\n{news.url}\t{news.title}".encode('utf-8'))
+    return digest.hexdigest()
+
+
+"""已發送新聞去重存儲（SQLite）：URL 主鍵索引查詢、批量寫入、按時間過期，WAL 模式支持多進程併發寫入"""
+class SentNewsStore:
+    def __init__(self, db_file: str):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_file, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS sent_news (
+                url TEXT PRIMARY KEY,
+                sent_at REAL NOT NULL,
+                content_hash TEXT,
+                keywords TEXT
+            ) WITHOUT ROWID""")
+        # 舊版數據庫沒有指紋字段
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(sent_news)")}
+        for column in ('content_hash', 'keywords'):
+            if column not in columns:
+                self._conn.execute(f"ALTER TABLE sent_news ADD COLUMN {column} TEXT")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_sent_news_sent_at ON sent_news (sent_at)")
+        self._conn.commit()
+
+    def __contains__(self, url: str) -> bool:
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM sent_news WHERE url = ?", (url,)).fetchone() is not None
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM sent_news").fetchone()[0]
+
+    def __iter__(self) -> Iterator[str]:
+        with self._lock:
+            urls = [row[0] for row in self._conn.execute("SELECT url FROM sent_news")]
+        return iter(urls)
+
+    def add(self, url: str):
+        self.update([url])
+
+    """在一個事務中批量寫入；fingerprints 爲 {鍵: {'hash': 內容指紋, 'keywords': [已通知的關鍵詞]}}，
+    帶指紋的鍵會覆蓋原有記錄（內容更新後再次發送）"""
+    def update(self, urls, sent_at: Optional[float] = None, fingerprints: Optional[Dict[str, Dict]] = None):
+        sent_at = sent_at or time.time()
+        fingerprints = fingerprints or {}
+        with self._lock:
+            with self._conn:
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO sent_news (url, sent_at) VALUES (?, ?)",
+                    ((url, sent_at) for url in urls if url not in fingerprints)
+                )
+                self._conn.executemany(
+                    """INSERT INTO sent_news (url, sent_at, content_hash, keywords) VALUES (?, ?, ?, ?)
+                       ON CONFLICT (url) DO UPDATE SET
+                           sent_at = excluded.sent_at, content_hash = excluded.content_hash, keywords = excluded.keywords""",
+                    ((url, sent_at, fp['hash'], json.dumps(fp['keywords'], ensure_ascii=False))
+                     for url, fp in fingerprints.items())
+                )
+
+    """讀取已發送記錄的指紋，返回 (內容指紋, [已通知的關鍵詞])；無記錄時返回 None，舊記錄的指紋爲 None"""
+    def fingerprint(self, url: str) -> Optional[Tuple[Optional[str], List[str]]]:
+        with self._lock:
+            row = self._conn.execute("SELECT content_hash, keywords FROM sent_news WHERE url = ?", (url,)).fetchone()
+        if row is None:
+            return None
+        return row[0], json.loads(row[1]) if row[1] else []
+
+    """更新已發送記錄的指紋（不改變發送時間）"""
+    def set_fingerprint(self, url: str, content_hash: str, keywords: List[str]):
+        with self._lock:
+            with self._conn:
+                self._conn.execute(
+                    "UPDATE sent_news SET content_hash = ?, keywords = ? WHERE url = ?",
+                    (content_hash, json.dumps(keywords, ensure_ascii=False), url)
+                )
+
+    """刪除早於 ttl_days 天的記錄，返回刪除數量"""
+    def expire(self, ttl_days: float) -> int:
+        cutoff = time.time() - ttl_days * 86400
+        with self._lock:
+            with self._conn:
+                return self._conn.execute("DELETE FROM sent_news WHERE sent_at < ?", (cutoff,)).rowcount
+
+    """從舊版 sent_news.json 一次性導入，返回導入數量"""
+    def migrate_from_json(self, json_file: str) -> int:
+        with open(json_file, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        urls = data.get('sent_urls', [])
+        sent_at = None
+        if data.get('last_updated'):
+            sent_at = datetime.fromisoformat(data['last_updated']).timestamp()
+        self.update(urls, sent_at)
+        return len(urls)
+
+
+"""通知發件箱：各渠道待投遞的條目（郵件、webhook、文件）持久化到磁盤，投遞確認後才移除，下次運行可繼續發送；
+每個條目屬於一個渠道，舊版本寫入的條目沒有 channel 字段，視爲郵件"""
+class EmailOutbox:
+    def __init__(self, outbox_file: str):
+        self.outbox_file = outbox_file
+        self.entries = []
+        self._lock = threading.Lock()
+
+    """從文件加載未發送的郵件"""
+    def load(self):
+        if os.path.exists(self.outbox_file):
+            with open(self.outbox_file, 'r', encoding='utf-8') as f:
+                self.entries = json.load(f).get('messages', [])
+
+    """加入一封待發送郵件並立即寫盤"""
+    def add(self, email_from: str, email_to: List[str], message: str, sent_keys: List[str], profile: str,
+            fingerprints: Optional[Dict[str, Dict]] = None) -> Dict:
+        return self._append({
+            'channel': 'email',
+            'email_from': email_from,
+            'email_to': email_to,
+            'message': message
+        }, sent_keys, profile, fingerprints)
+    
+    """加入一條其他渠道的通知（target 爲 webhook 地址或文件路徑，payload 爲 JSON 對象）並立即寫盤"""
+    def add_notification(self, channel: str, target: str, payload: Dict, sent_keys: List[str], profile: str,
+                         fingerprints: Optional[Dict[str, Dict]] = None) -> Dict:
+        return self._append({'channel': channel, 'target': target, 'payload': payload}, sent_keys, profile, fingerprints)
+    
+    def _append(self, fields: Dict, sent_keys: List[str], profile: str, fingerprints: Optional[Dict[str, Dict]]) -> Dict:
+        entry = dict(fields,
+                     id=uuid.uuid4().hex,
+                     profile=profile,
+                     sent_keys=sent_keys,
+                     fingerprints=fingerprints or {},
+                     attempts=0,
+                     last_error=None,
+                     created_at=time.time())
+        with self._lock:
+            self.entries.append(entry)
+        self.save()
+        return entry
+    
+    """某個渠道尚未投遞的條目"""
+    def entries_for(self, channel: str) -> List[Dict]:
+        with self._lock:
+            return [entry for entry in self.entries if entry.get('channel', 'email') == channel]
+
+    """移除已投遞的郵件"""
+    def remove(self, entry_id: str):
+        with self._lock:
+            self.entries = [entry for entry in self.entries if entry['id'] != entry_id]
+
+    """刪除超過 max_age_days 天仍未發出的郵件，返回被刪除的條目"""
+    def expire(self, max_age_days: float) -> List[Dict]:
+        cutoff = time.time() - max_age_days * 86400
+        with self._lock:
+            expired = [entry for entry in self.entries if entry['created_at'] < cutoff]
+            self.entries = [entry for entry in self.entries if entry['created_at'] >= cutoff]
+        return expired
+
+    """發件箱中尚未投遞的已發送記錄鍵（用於避免重複排隊）"""
+    def pending_keys(self) -> Set[str]:
+        with self._lock:
+            return {key for entry in self.entries for key in entry['sent_keys']}
+
+    """寫盤（投遞線程與主線程都會調用，寫文件時持有鎖）"""
+    def save(self):
+        with self._lock:
+            data = {'messages': list(self.entries), 'last_updated': datetime.now().isoformat()}
+            tmp_file = self.outbox_file + '.tmp'
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_file, self.outbox_file)
+
+
+"""郵件摘要緩衝：開啓摘要模式的訂閱把多輪輪詢的匹配結果暫存到磁盤，到期後合併成一封郵件"""
+class EmailDigest:
+    def __init__(self, digest_file: str):
+        self.digest_file = digest_file
+        # 訂閱名 → {'started_at': 首條新聞加入的時間, 'items': [...]}
+        self.batches = {}
+        self._lock = threading.Lock()
+
+    def load(self):
+        if os.path.exists(self.digest_file):
+            with open(self.digest_file, 'r', encoding='utf-8') as f:
+                self.batches = json.load(f).get('batches', {})
+
+    """把新聞加入訂閱的摘要並立即寫盤（同一 URL 再次加入時以新內容替換）；sent_keys 與 news_list 一一對應，每項爲該新聞各渠道的已發送記錄鍵"""
+    def add(self, profile: str, news_list: List[NewsItem], sent_keys: List[List[str]]):
+        with self._lock:
+            batch = self.batches.setdefault(profile, {'started_at': time.time(), 'items': []})
+            positions = {item['url']: i for i, item in enumerate(batch['items'])}
+            for news, keys in zip(news_list, sent_keys):
+                item = self._dump(news, keys)
+                if news.url in positions:
+                    batch['items'][positions[news.url]] = item
+                else:
+                    batch['items'].append(item)
+        self.save()
+
+    """摘要開始累積的時間戳，沒有待發送新聞時返回 None"""
+    def started_at(self, profile: str) -> Optional[float]:
+        with self._lock:
+            batch = self.batches.get(profile)
+            return batch['started_at'] if batch else None
+
+    def items(self, profile: str) -> List[NewsItem]:
+        with self._lock:
+            batch = self.batches.get(profile)
+            return [self._load(item) for item in batch['items']] if batch else []
+
+    """移除已寫入發件箱的摘要"""
+    def clear(self, profile: str):
+        with self._lock:
+            self.batches.pop(profile, None)
+        self.save()
+
+    """摘要中尚未發送的已發送記錄鍵（用於避免重複加入）"""
+    def pending_keys(self) -> Set[str]:
+        with self._lock:
+            return {key for batch in self.batches.values() for item in batch['items'] for key in self._keys(item)}
+
+    def save(self):
+        with self._lock:
+            data = {'batches': dict(self.batches), 'last_updated': datetime.now().isoformat()}
+        tmp_file = self.digest_file + '.tmp'
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_file, self.digest_file)
+
+    """條目的已發送記錄鍵（兼容舊版摘要文件的單個 sent_key）"""
+    @staticmethod
+    def _keys(item: Dict) -> List[str]:
+        return item['sent_keys'] if 'sent_keys' in item else [item['sent_key']]
+    
+    @staticmethod
+    def _dump(news: NewsItem, sent_keys: List[str]) -> Dict:
+        return {
+            'sent_keys': sent_keys,
+            'url': news.url,
+            'title': news.title,
+            'publish_time': news.publish_time.isoformat() if news.publish_time else None,
+            'source': news.source,
+            'content': news.content,
+            'content_failed': news.content_failed,
+            'matched_keywords': news.matched_keywords,
+            'updated_for': news.updated_for
+        }
+
+    @staticmethod
+    def _load(item: Dict) -> NewsItem:
+        publish_time = datetime.fromisoformat(item['publish_time']) if item.get('publish_time') else None
+        news = NewsItem(item['title'], item['url'], publish_time, item.get('content'), item.get('source'))
+        news.content_failed = item.get('content_failed', False)
+        news.matched_keywords = item.get('matched_keywords')
+        news.updated_for = item.get('updated_for')
+        return news
+
+
+"""郵件渲染器：頁面及新聞條目模板（string.Template）只編譯一次，條目渲染後一次性拼接；
+標題、預覽、關鍵詞等文本均經 HTML 轉義
+
+頁面模板可用 $title、$now、$count、$period、$items，條目模板可用 $index、$url、$title、$badges、$preview、$time"""
+class EmailRenderer:
+    PAGE_TEMPLATE = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<style>
+  body { font-family: 'Microsoft YaHei', 'Segoe UI', Arial, sans-serif; background: #f4f6f9; margin: 0; padding: 20px; }
+  .container { max-width: 700px; margin: 0 auto; background: #ffffff; border-radius: 10px; box-shadow: 0 2px 12px rgba(0,0,0,0.08); overflow: hidden; }
+  .header { background: linear-gradient(135deg, #1a73e8, #0d47a1); padding: 24px 30px; color: #ffffff; }
+  .header h1 { margin: 0; font-size: 22px; font-weight: 600; }
+  .header p { margin: 8px 0 0; font-size: 13px; opacity: 0.85; }
+  .content { padding: 24px 30px; }
+  .summary { background: #e8f0fe; border-left: 4px solid #1a73e8; padding: 12px 16px; margin-bottom: 20px; border-radius: 0 6px 6px 0; font-size: 14px; color: #1a56b8; }
+  .news-item { border: 1px solid #e8eaed; border-radius: 8px; padding: 16px 20px; margin-bottom: 14px; transition: box-shadow 0.2s; }
+  .news-item:hover { box-shadow: 0 2px 8px rgba(0,0,0,0.1); }
+  .news-title { font-size: 16px; font-weight: 600; color: #202124; margin: 0 0 8px; }
+  .news-title a { color: #1a73e8; text-decoration: none; }
+  .news-title a:hover { text-decoration: underline; }
+  .news-preview { font-size: 13px; color: #5f6368; line-height: 1.6; margin: 0; }
+  .news-time { font-size: 12px; color: #9aa0a6; margin-top: 8px; }
+  .footer { padding: 16px 30px; background: #f8f9fa; border-top: 1px solid #e8eaed; text-align: center; font-size: 12px; color: #9aa0a6; }
+  .badge { display: inline-block; background: #e8f0fe; color: #1a73e8; padding: 2px 8px; border-radius: 4px; font-size: 12px; font-weight: 500; margin-left: 8px; }
+  .badge-updated { background: #fef7e0; color: #b06000; }
+</style>
+</head>
+<body>
+<div class="container">
+  <div class="header">
+    <h1>澳門新聞局 — $title</h1>
+    <p>監控時間: $now</p>
+  </div>
+  <div class="content">
+    <div class="summary">
+      共發現 <strong>$count</strong> 條相關新聞$period
+    </div>
+$items
+  </div>
+  <div class="footer">
+     數據來源: <a href="https://www.gcs.gov.mo" style="color:#1a73e8;">澳門新聞局</a>
+  </div>
+</div>
+</body>
+</html>
+"""
+    ITEM_TEMPLATE = """
+    <div class="news-item">
+      <p class="news-title">
+        $index. <a href="$url" target="_blank">$title</a>
+        $badges
+      </p>
+      $preview
+      $time
+    </div>
+"""
+    PREVIEW_LENGTH = 300
+    
+    def __init__(self, page_template: Optional[str] = None, item_template: Optional[str] = None):
+        self.page = Template(page_template or self.PAGE_TEMPLATE)
+        self.item = Template(item_template or self.ITEM_TEMPLATE)
+    
+    """從模板文件創建渲染器（未指定的模板使用內置模板）"""
+    @classmethod
+    def from_files(cls, page_file: Optional[str] = None, item_file: Optional[str] = None) -> 'EmailRenderer':
+        templates = []
+        for path in (page_file, item_file):
+            if path:
+                with open(path, 'r', encoding='utf-8') as f:
+                    templates.append(f.read())
+            else:
+                templates.append(None)
+        return cls(*templates)
+    
+    def render_item(self, index: int, news: NewsItem, keywords: Optional[List[str]] = None,
+                    profile_name: Optional[str] = None) -> str:
+        preview = ''
+        if news.content:
+            preview = news.content[:self.PREVIEW_LENGTH]
+            if len(news.content) > self.PREVIEW_LENGTH:
+                preview += '...'
+        
+        badges = ''.join(f'<span class="badge">{escape(kw)}</span>' for kw in news.matched_keywords or {}
+                         if keywords is None or kw in keywords)
+        if profile_name in (news.updated_for or {}):
+            badges += '<span class="badge badge-updated">內容更新</span>'
+        
+        return self.item.safe_substitute(
+            index=index,
+            url=escape(news.url),
+            title=escape(news.title),
+            badges=badges,
+            preview=f"<p class='news-preview'>{escape(preview)}</p>" if preview else '',
+            time=f"<p class='news-time'>{news.publish_time.strftime('%Y-%m-%d %H:%M')}</p>" if news.publish_time else ''
+        )
+    
+    """HTML 正文；since 爲摘要開始累積的時間，title 爲訂閱的新聞主題"""
+    def render_html(self, news_list: List[NewsItem], keywords: Optional[List[str]] = None,
+                    profile_name: Optional[str] = None, since: Optional[datetime] = None,
+                    title: Optional[str] = None) -> str:
+        items = ''.join(self.render_item(i, news, keywords, profile_name) for i, news in enumerate(news_list, 1))
+        return self.page.safe_substitute(
+            title=escape(title or '相關新聞'),
+            now=datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            count=len(news_list),
+            period=f"（{since.strftime('%m-%d %H:%M')} 起彙總）" if since else '',
+            items=items
+        )
+    
+    """純文本備用正文"""
+    def render_text(self, news_list: List[NewsItem], since: Optional[datetime] = None) -> str:
+        period = f"（{since.strftime('%m-%d %H:%M')} 起彙總）" if since else ''
+        lines = [f"澳門新聞局新聞監控\n\n共發現 {len(news_list)} 條相關新聞{period}:\n\n"]
+        lines += [f"{i}. {news.title}\n   鏈接: {news.url}\n\n" for i, news in enumerate(news_list, 1)]
+        return ''.join(lines)
+
+
+"""SMTP 投遞器：一批郵件共用一個已認證的連接，暫時性失敗時重連並以指數退避重試"""
+class SmtpDelivery:
+    # 連接空閒超過該秒數後先以 NOOP 確認仍可用（常駐模式下連接跨輪次保留，服務器可能已斷開）
+    IDLE_CHECK_SECONDS = 30
+    
+    def __init__(self, config: dict, logger: logging.Logger, metrics: Optional['Metrics'] = None):
+        self.config = config
+        self.logger = logger
+        self.metrics = metrics
+        self._server = None
+        self._last_used = 0.0
+
+    """建立連接並登錄"""
+    def _connect(self) -> smtplib.SMTP:
+        smtp_server = self.config.get('smtp_server', 'smtp-mail.outlook.com')
+        smtp_port = self.config.get('smtp_port', 587)
+        if self.config.get('smtp_use_ssl', False):
+            # SSL 連接（端口 465）
+            context = ssl.create_default_context()
+            server = smtplib.SMTP_SSL(smtp_server, smtp_port, context=context, timeout=30)
+        else:
+            # TLS 連接（端口 587）；smtp_starttls 爲 false 時用於本地明文中繼
+            server = smtplib.SMTP(smtp_server, smtp_port, timeout=30)
+            server.ehlo()
+            if self.config.get('smtp_starttls', True):
+                server.starttls()
+                server.ehlo()
+        try:
+            server.login(self.config.get('smtp_username', ''), self.config.get('smtp_password', ''))
+        except Exception:
+            server.close()
+            raise
+        self.logger.debug(f"已連接 SMTP 服務器 {smtp_server}:{smtp_port}")
+        return server
+
+    """發送一封郵件；認證失敗及 5xx 永久性錯誤直接拋出，其他錯誤重連後退避重試"""
+    def send(self, email_from: str, email_to: List[str], message: str):
+        max_retries = self.config.get('smtp_max_retries', 3)
+        retry_delay = self.config.get('smtp_retry_delay', 2)
+        
+        for attempt in range(max_retries + 1):
+            try:
+                if self._server is not None and time.time() - self._last_used > self.IDLE_CHECK_SECONDS:
+                    self._check_idle()
+                if self._server is None:
+                    self._server = self._connect()
+                self._server.sendmail(email_from, email_to, message)
+                self._last_used = time.time()
+                return
+            except smtplib.SMTPAuthenticationError:
+                self.close()
+                raise
+            except smtplib.SMTPRecipientsRefused:
+                raise
+            except (smtplib.SMTPException, OSError) as e:
+                if getattr(e, 'smtp_code', 0) >= 500:
+                    raise
+                self.close()
+                if attempt == max_retries:
+                    raise
+                delay = retry_delay * (2 ** attempt)
+                if self.metrics:
+                    self.metrics.inc('gcs_monitor_smtp_retries_total')
+                self.logger.warning(f"SMTP 發送失敗，{delay} 秒後重試 ({attempt + 1}/{max_retries}): {e}")
+                time.sleep(delay)
+
+    """空閒連接已被服務器斷開時關閉，隨後重新連接"""
+    def _check_idle(self):
+        try:
+            code = self._server.noop()[0]
+        except (smtplib.SMTPException, OSError):
+            code = 0
+        if code != 250:
+            self.logger.debug("SMTP 空閒連接已斷開，重新連接")
+            self.close()
+    
+    """關閉連接"""
+    def close(self):
+        if self._server is not None:
+            try:
+                self._server.quit()
+            except Exception:
+                self._server.close()
+            self._server = None
+
+
+"""郵件通知渠道：經 SmtpDelivery 投遞發件箱中的郵件（同一批次共用一個已認證的連接）"""
+class SmtpChannel:
+    name = 'email'
+    stage = 'send_email'
+    # 認證失敗時本輪不再嘗試該渠道的其他條目
+    fatal_errors = (smtplib.SMTPAuthenticationError,)
+    
+    def __init__(self, delivery: SmtpDelivery):
+        self.delivery = delivery
+    
+    def send(self, entry: Dict):
+        self.delivery.send(entry['email_from'], entry['email_to'], entry['message'])
+
+
+"""Webhook 通知渠道：把匹配批次以 JSON POST 到 HTTP 端點；獨立的會話、超時及重試設置，
+429/5xx/連接錯誤按指數退避重試（遵守 Retry-After），其他 4xx 直接失敗"""
+class WebhookChannel:
+    name = 'webhook'
+    stage = 'notify_webhook'
+    fatal_errors = ()
+    
+    def __init__(self, config: dict, logger: logging.Logger, metrics: Optional['Metrics'] = None):
+        self.logger = logger
+        self.metrics = metrics
+        self.timeout = (config.get('webhook_connect_timeout', 5), config.get('webhook_timeout', 10))
+        self.max_retries = config.get('webhook_max_retries', 3)
+        self.retry_delay = config.get('webhook_retry_delay', 2)
+        self.session = requests.Session()
+        self.session.headers.update({'Content-Type': 'application/json; charset=utf-8'})
+        self.session.headers.update(config.get('webhook_headers') or {})
+    
+    def send(self, entry: Dict):
+        body = json.dumps(entry['payload'], ensure_ascii=False).encode('utf-8')
+        for attempt in range(self.max_retries + 1):
+            retry_after = None
+            try:
+                response = self.session.post(entry['target'], data=body, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error = e
+            else:
+                with response:
+                    if not _is_retryable_status(response.status_code):
+                        response.raise_for_status()
+                        return
+                    retry_after = _parse_retry_after(response.headers.get('Retry-After'))
+                    error = requests.HTTPError(f"{response.status_code} 響應: {entry['target']}", response=response)
+            
+            if attempt == self.max_retries:
+                raise error
+            delay = max(retry_after or 0.0, self.retry_delay * (2 ** attempt))
+            if self.metrics:
+                self.metrics.inc('gcs_monitor_notify_retries_total', channel=self.name)
+            self.logger.warning(f"Webhook 投遞失敗，{delay} 秒後重試 ({attempt + 1}/{self.max_retries}): {error}")
+            time.sleep(delay)
+
+
+"""文件通知渠道：每個匹配批次追加一行 JSON 到本地 JSONL 文件，供其他程序讀取"""
+class FileChannel:
+    name = 'file'
+    stage = 'notify_file'
+    fatal_errors = ()
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+    
+    def send(self, entry: Dict):
+        line = json.dumps(dict(entry['payload'], delivered_at=datetime.now().isoformat()), ensure_ascii=False)
+        with self._lock:
+            with open(entry['target'], 'a', encoding='utf-8') as f:
+                f.write(line + '\n')
+
+
+"""httpx 響應體的 urllib3 風格包裝，供 requests.Response 讀取（內容已按 Content-Encoding 解壓）"""
+class _HttpxBody:
+    def __init__(self, response: 'httpx.Response'):
+        self._response = response
+    
+    """逐塊產出解壓後的響應體，傳輸錯誤轉換爲 requests 異常"""
+    def stream(self, chunk_size: int = 16384, decode_content: bool = True) -> Iterator[bytes]:
+        try:
+            yield from self._response.iter_bytes(chunk_size)
+        except httpx.TimeoutException as e:
+            raise requests.ReadTimeout(e)
+        except httpx.HTTPError as e:
+            raise requests.ConnectionError(e)
+        finally:
+            self._response.close()
+    
+    def close(self):
+        self._response.close()
+
+
+"""HTTP/2 適配器：經 httpx 發送 requests 會話的請求，同一主機的併發請求在一個連接上多路複用
+（服務器不支持或明文 http 時協商爲 HTTP/1.1）；返回標準的 requests.Response"""
+class Http2Adapter(BaseAdapter):
+    # HTTP/2 禁止的逐跳請求頭
+    HOP_HEADERS = frozenset(('connection', 'keep-alive', 'proxy-connection', 'transfer-encoding', 'upgrade'))
+    
+    def __init__(self, pool_size: int, timeout: Tuple[float, float], keepalive: float, retries: int,
+                 on_trace: Callable[[str, Dict], None]):
+        super().__init__()
+        self.timeout = timeout
+        self._on_trace = on_trace
+        limits = httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size, keepalive_expiry=keepalive)
+        # 未安裝 h2 時拋出 ImportError
+        self.client = httpx.Client(
+            http2=True,
+            timeout=self._timeout(timeout),
+            transport=httpx.HTTPTransport(http2=True, limits=limits, retries=retries)
+        )
+    
+    """requests 的 (連接, 讀取) 超時轉換爲 httpx.Timeout"""
+    @staticmethod
+    def _timeout(timeout) -> 'httpx.Timeout':
+        if isinstance(timeout, tuple):
+            connect, read = timeout
+            return httpx.Timeout(read, connect=connect)
+        return httpx.Timeout(timeout)
+    
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        headers = [(k, v) for k, v in request.headers.items() if k.lower() not in self.HOP_HEADERS]
+        try:
+            httpx_request = self.client.build_request(
+                request.method, request.url, headers=headers, content=request.body,
+                timeout=self._timeout(timeout or self.timeout), extensions={'trace': self._on_trace}
+            )
+            result = self.client.send(httpx_request, stream=True)
+        except httpx.ConnectTimeout as e:
+            raise requests.ConnectTimeout(e, request=request)
+        except httpx.TimeoutException as e:
+            raise requests.ReadTimeout(e, request=request)
+        except httpx.HTTPError as e:
+            raise requests.ConnectionError(e, request=request)
+        
+        response = requests.Response()
+        response.status_code = result.status_code
+        response.reason = result.reason_phrase
+        response.headers = CaseInsensitiveDict(result.headers)
+        response.encoding = get_encoding_from_headers(response.headers)
+        response.url = request.url
+        response.request = request
+        response.connection = self
+        response.raw = _HttpxBody(result)
+        self._on_trace('response', {'http_version': result.http_version})
+        return response
+    
+    def close(self):
+        self.client.close()
+
+
+"""HTTP 傳輸層：共用的 requests 會話，連接池大小與抓取併發上限匹配、協商 gzip/brotli 壓縮、
+連接及讀取分開超時，建立連接失敗時立即重連（限流及 5xx 仍由調用方退避重試）；http2 開啓時改經 httpx 以 HTTP/2 多路複用。
+按客戶端統計請求數及新建連接數，用於確認連接（https 下即 TLS 握手）在請求之間得到複用"""
+class HttpTransport:
+    USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+    
+    def __init__(self, config: dict, logger: logging.Logger, metrics: Optional['Metrics'] = None):
+        self.config = config
+        self.logger = logger
+        self.metrics = metrics
+        self.timeout = (config.get('http_connect_timeout', 10), config.get('http_read_timeout', 30))
+        self.keepalive = config.get('http_keepalive_timeout', 30)
+        self.pool_size = config.get('http_pool_size', 0) or max(config.get('concurrent_requests', 5),
+                                                                config.get('max_concurrent_requests', 20))
+        self._lock = threading.Lock()
+        self._counts = {}
+        
+        self.session = requests.Session()
+        self.session.headers.update({
+            'User-Agent': self.USER_AGENT,
+            'Accept-Encoding': 'gzip, deflate, br' if brotli is not None else 'gzip, deflate'
+        })
+        self.adapter = self._create_adapter()
+        self.session.mount('https://', self.adapter)
+        self.session.mount('http://', self.adapter)
+    
+    """創建適配器：http2 開啓且已安裝 httpx[http2] 時使用 HTTP/2 適配器，否則爲 urllib3 連接池"""
+    def _create_adapter(self) -> BaseAdapter:
+        retries = self.config.get('http_connection_retries', 1)
+        if self.config.get('http2', False):
+            if httpx is None:
+                self.logger.warning("未安裝 httpx，無法使用 HTTP/2，改用 HTTP/1.1 連接池")
+            else:
+                try:
+                    return Http2Adapter(self.pool_size, self.timeout, self.keepalive, retries, self._on_httpx_trace)
+                except ImportError:
+                    self.logger.warning("未安裝 h2（pip install httpx[http2]），無法使用 HTTP/2，改用 HTTP/1.1 連接池")
+        
+        # 連接池不小於併發上限，避免多餘連接被丟棄後重新握手
+        return HTTPAdapter(
+            pool_connections=10,
+            pool_maxsize=self.pool_size,
+            max_retries=Retry(connect=retries, read=False, status=0, other=0, redirect=False, backoff_factor=0)
+        )
+    
+    """發送 GET 請求（使用配置的連接及讀取超時）"""
+    def get(self, url: str, headers: Optional[Dict[str, str]] = None, stream: bool = False) -> requests.Response:
+        return self.session.get(url, headers=headers, timeout=self.timeout, stream=stream)
+    
+    def _count(self, client: str, key: str, value: int = 1):
+        with self._lock:
+            counts = self._counts.setdefault(client, {})
+            counts[key] = counts.get(key, 0) + value
+    
+    """httpx 的連接跟蹤回調：記錄新建連接、TLS 握手及協商的協議版本"""
+    def _on_httpx_trace(self, event: str, info: Dict):
+        if event == 'connection.connect_tcp.complete':
+            self._count('httpx', 'connections')
+        elif event == 'connection.start_tls.complete':
+            self._count('httpx', 'tls_handshakes')
+        elif event == 'response':
+            self._count('httpx', 'requests')
+            if info.get('http_version') == 'HTTP/2':
+                self._count('httpx', 'http2_requests')
+    
+    """異步引擎的連接跟蹤配置：記錄請求數及新建連接數"""
+    def trace_config(self) -> 'aiohttp.TraceConfig':
+        trace = aiohttp.TraceConfig()
+        
+        async def on_request_start(session, context, params):
+            self._count('aiohttp', 'requests')
+        
+        async def on_connection_create_end(session, context, params):
+            self._count('aiohttp', 'connections')
+        
+        trace.on_request_start.append(on_request_start)
+        trace.on_connection_create_end.append(on_connection_create_end)
+        return trace
+    
+    """連接複用統計：{客戶端: {requests, connections, reuse_ratio, ...}}；reuse_ratio 爲複用已有連接的請求比例"""
+    def stats(self) -> Dict[str, Dict]:
+        with self._lock:
+            result = {client: dict(counts) for client, counts in self._counts.items()}
+        
+        if isinstance(self.adapter, HTTPAdapter):
+            pools = self.adapter.poolmanager.pools
+            counts = {'requests': 0, 'connections': 0, 'tls_handshakes': 0}
+            for key in pools.keys():
+                pool = pools.get(key)
+                if pool is None:
+                    continue
+                counts['requests'] += pool.num_requests
+                counts['connections'] += pool.num_connections
+                if pool.scheme == 'https':
+                    counts['tls_handshakes'] += pool.num_connections
+            if counts['requests']:
+                result['requests'] = counts
+        
+        for counts in result.values():
+            requests_sent = counts.setdefault('requests', 0)
+            connections = counts.setdefault('connections', 0)
+            counts['reuse_ratio'] = round(1 - connections / requests_sent, 4) if requests_sent else 0.0
+        return result
+    
+    """把連接複用統計寫入運行指標（累計值），返回統計結果"""
+    def record_metrics(self) -> Dict[str, Dict]:
+        stats = self.stats()
+        if self.metrics is not None:
+            for client, counts in stats.items():
+                self.metrics.set('gcs_monitor_http_requests_sent', counts['requests'], client=client)
+                self.metrics.set('gcs_monitor_http_connections_opened', counts['connections'], client=client)
+                self.metrics.set('gcs_monitor_http_connection_reuse_ratio', counts['reuse_ratio'], client=client)
+        return stats
+    
+    """關閉會話及所有連接"""
+    def close(self):
+        self.session.close()
+
+
+"""增量抓取檢查點：按列表 URL 記錄已處理過的最新發佈時間（高水位）及近期 URL"""
+class CrawlCheckpoint:
+    def __init__(self, state_file: str, max_urls: int = 500):
+        self.state_file = state_file
+        self.max_urls = max_urls
+        self.state = {}
+        self._pending = {}
+        self._pending_listing = {}
+        self._lock = threading.Lock()
+
+    """從文件加載檢查點"""
+    def load(self):
+        if os.path.exists(self.state_file):
+            with open(self.state_file, 'r', encoding='utf-8') as f:
+                self.state = json.load(f)
+
+    """列表 URL 是否已有檢查點（沒有時需要完整抓取）"""
+    def has(self, news_url: str) -> bool:
+        return news_url in self.state
+
+    """該頁是否已到達上次抓取的位置：出現已處理過的 URL，或發佈時間早於高水位"""
+    def reached(self, news_url: str, news_list: List[NewsItem]) -> bool:
+        entry = self.state.get(news_url)
+        if not entry:
+            return False
+        seen_urls = set(entry.get('seen_urls', []))
+        newest = entry.get('newest_publish_time')
+        newest = datetime.fromisoformat(newest) if newest else None
+        for news in news_list:
+            if news.url in seen_urls:
+                return True
+            if newest and news.publish_time and news.publish_time < newest:
+                return True
+        return False
+
+    """上次完整處理時列表首頁的指紋、ETag / Last-Modified 及處理時間（未記錄時返回 None）"""
+    def listing(self, news_url: str) -> Optional[Dict]:
+        return self.state.get(news_url, {}).get('listing')
+
+    """記錄本輪列表首頁的指紋（與新聞一同提交，本輪未完整處理時不會保存）"""
+    def observe_listing(self, news_url: str, listing: Dict):
+        with self._lock:
+            self._pending_listing[news_url] = listing
+
+    """記錄本輪已處理完成的新聞（提交前不影響分頁判斷）"""
+    def observe(self, news_url: str, news: NewsItem):
+        with self._lock:
+            self._pending.setdefault(news_url, []).append(news)
+
+    """把本輪記錄合併進檢查點並寫盤"""
+    def commit(self):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            pending_listing, self._pending_listing = self._pending_listing, {}
+        for news_url, listing in pending_listing.items():
+            self.state.setdefault(news_url, {'newest_publish_time': None, 'seen_urls': []})['listing'] = listing
+        for news_url, news_list in pending.items():
+            entry = self.state.setdefault(news_url, {'newest_publish_time': None, 'seen_urls': []})
+            times = [n.publish_time for n in news_list if n.publish_time]
+            if entry['newest_publish_time']:
+                times.append(datetime.fromisoformat(entry['newest_publish_time']))
+            if times:
+                entry['newest_publish_time'] = max(times).isoformat()
+            new_urls = [n.url for n in news_list if n.url not in entry['seen_urls']]
+            entry['seen_urls'] = (new_urls + entry['seen_urls'])[:self.max_urls]
+            entry['last_updated'] = datetime.now().isoformat()
+        if not pending and not pending_listing:
+            return
+        tmp_file = self.state_file + '.tmp'
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(self.state, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_file, self.state_file)
+
+    """放棄本輪記錄（發送失敗時下次仍需重新處理）"""
+    def discard(self):
+        with self._lock:
+            self._pending = {}
+            self._pending_listing = {}
+
+
+"""文章內文緩存：以 URL 爲鍵保存抽取後的內文及 ETag/Last-Modified（SQLite）"""
+class ArticleCache:
+    def __init__(self, db_file: str, ttl: int, max_bytes: int):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_file, check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS articles (
+                url TEXT PRIMARY KEY,
+                content TEXT NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                fetched_at REAL NOT NULL,
+                accessed_at REAL NOT NULL,
+                size INTEGER NOT NULL,
+                title TEXT
+            )""")
+        if 'title' not in {row[1] for row in self._conn.execute("PRAGMA table_info(articles)")}:
+            self._conn.execute("ALTER TABLE articles ADD COLUMN title TEXT")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_articles_accessed ON articles (accessed_at)")
+        self._conn.commit()
+
+    """讀取緩存條目，不存在時返回 None"""
+    def get(self, url: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT content, etag, last_modified, fetched_at, title FROM articles WHERE url = ?", (url,)
+            ).fetchone()
+        if not row:
+            return None
+        return {'content': row[0], 'etag': row[1], 'last_modified': row[2], 'fetched_at': row[3], 'title': row[4]}
+
+    """條目是否仍在 TTL 內（無需重新驗證）"""
+    def is_fresh(self, entry: Dict) -> bool:
+        return time.time() - entry['fetched_at'] < self.ttl
+
+    """寫入或更新緩存條目（title 爲列表頁上的標題，用於發現文章更新）"""
+    def put(self, url: str, content: str, etag: Optional[str], last_modified: Optional[str], title: Optional[str] = None):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                """INSERT OR REPLACE INTO articles (url, content, etag, last_modified, fetched_at, accessed_at, size, title)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+                (url, content, etag, last_modified, now, now, len(content.encode('utf-8')), title)
+            )
+            self._conn.commit()
+
+    """重新驗證成功（304）後刷新時間戳"""
+    def touch(self, url: str, fetched: bool = False):
+        now = time.time()
+        with self._lock:
+            if fetched:
+                self._conn.execute("UPDATE articles SET fetched_at = ?, accessed_at = ? WHERE url = ?", (now, now, url))
+            else:
+                self._conn.execute("UPDATE articles SET accessed_at = ? WHERE url = ?", (now, url))
+            self._conn.commit()
+
+    """記錄命中統計"""
+    def record(self, kind: str):
+        with self._lock:
+            setattr(self, kind, getattr(self, kind) + 1)
+
+    """按最近訪問時間淘汰條目，直到總大小不超過上限，返回淘汰數量"""
+    def evict(self) -> int:
+        with self._lock:
+            total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM articles").fetchone()[0]
+            if total <= self.max_bytes:
+                return 0
+            evicted = 0
+            rows = self._conn.execute("SELECT url, size FROM articles ORDER BY accessed_at").fetchall()
+            for url, size in rows:
+                if total <= self.max_bytes:
+                    break
+                self._conn.execute("DELETE FROM articles WHERE url = ?", (url,))
+                total -= size
+                evicted += 1
+            self._conn.commit()
+            return evicted
+
+    """重置本輪統計"""
+    def reset_stats(self):
+        with self._lock:
+            self.hits = self.revalidated = self.misses = 0
+
+
+"""本地文章庫（SQLite）：抓取過的新聞及內文、trigram 全文索引（FTS5，適用於中文等無空格文本），
+以及各回填分片的斷點（與文章在同一事務中提交）"""
+class ArticleStore:
+    UPSERT = """
+        INSERT INTO articles (url, source, title, publish_time, content, fetched_at) VALUES (?, ?, ?, ?, ?, ?)
+        ON CONFLICT (url) DO UPDATE SET
+            source = excluded.source,
+            title = excluded.title,
+            publish_time = COALESCE(excluded.publish_time, articles.publish_time),
+            content = COALESCE(excluded.content, articles.content),
+            fetched_at = excluded.fetched_at"""
+    
+    def __init__(self, db_file: str):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_file, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS articles (
+                id INTEGER PRIMARY KEY,
+                url TEXT NOT NULL UNIQUE,
+                source TEXT,
+                title TEXT NOT NULL,
+                publish_time TEXT,
+                content TEXT,
+                fetched_at REAL NOT NULL
+            )""")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_articles_publish_time ON articles (publish_time)")
+        self.fts_enabled = self._init_fts()
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS backfill_shards (
+                news_url TEXT NOT NULL,
+                start_page INTEGER NOT NULL,
+                end_page INTEGER NOT NULL,
+                next_page INTEGER NOT NULL,
+                done INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (news_url, start_page)
+            ) WITHOUT ROWID""")
+        self._conn.commit()
+
+    """建立 trigram 全文索引及同步觸發器；SQLite 不支持 FTS5 trigram 時返回 False（查詢退回 LIKE 掃描）"""
+    def _init_fts(self) -> bool:
+        exists = self._conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'articles_fts'").fetchone()
+        try:
+            self._conn.execute("""
+                CREATE VIRTUAL TABLE IF NOT EXISTS articles_fts USING fts5(
+                    title, content, content='articles', content_rowid='id', tokenize='trigram'
+                )""")
+        except sqlite3.OperationalError:
+            return False
+        self._conn.executescript("""
+            CREATE TRIGGER IF NOT EXISTS articles_fts_insert AFTER INSERT ON articles BEGIN
+                INSERT INTO articles_fts (rowid, title, content) VALUES (new.id, new.title, new.content);
+            END;
+            CREATE TRIGGER IF NOT EXISTS articles_fts_delete AFTER DELETE ON articles BEGIN
+                INSERT INTO articles_fts (articles_fts, rowid, title, content) VALUES ('delete', old.id, old.title, old.content);
+            END;
+            CREATE TRIGGER IF NOT EXISTS articles_fts_update AFTER UPDATE ON articles BEGIN
+                INSERT INTO articles_fts (articles_fts, rowid, title, content) VALUES ('delete', old.id, old.title, old.content);
+                INSERT INTO articles_fts (rowid, title, content) VALUES (new.id, new.title, new.content);
+            END;""")
+        if not exists:
+            self._conn.execute("INSERT INTO articles_fts (articles_fts) VALUES ('rebuild')")
+        self._conn.commit()
+        return True
+
+    def __contains__(self, url: str) -> bool:
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM articles WHERE url = ?", (url,)).fetchone() is not None
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM articles").fetchone()[0]
+
+    def _rows(self, news_list: List[NewsItem]) -> List[Tuple]:
+        now = time.time()
+        return [(news.url, news.source, news.title,
+                 news.publish_time.isoformat() if news.publish_time else None,
+                 news.content, now) for news in news_list]
+
+    """批量寫入新聞（已存在的文章更新標題等字段；新內文爲空值時保留原內文）"""
+    def add_articles(self, news_list: List[NewsItem]):
+        rows = self._rows(news_list)
+        with self._lock:
+            with self._conn:
+                self._conn.executemany(self.UPSERT, rows)
+
+    """寫入一頁新聞，並在同一事務中把分片斷點推進到 next_page"""
+    def add_page(self, news_list: List[NewsItem], news_url: str, start_page: int, next_page: int):
+        rows = self._rows(news_list)
+        with self._lock:
+            with self._conn:
+                self._conn.executemany(self.UPSERT, rows)
+                self._conn.execute(
+                    "UPDATE backfill_shards SET next_page = ? WHERE news_url = ? AND start_page = ?",
+                    (next_page, news_url, start_page)
+                )
+
+    """文章入庫時的標題（未入庫時返回 None）"""
+    def title(self, url: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT title FROM articles WHERE url = ?", (url,)).fetchone()
+        return row[0] if row else None
+
+    """補寫內文"""
+    def set_content(self, url: str, content: str):
+        with self._lock:
+            with self._conn:
+                self._conn.execute("UPDATE articles SET content = ?, fetched_at = ? WHERE url = ?", (content, time.time(), url))
+
+    """內文抓取失敗（內文爲空值）的文章"""
+    def missing_content(self) -> List[NewsItem]:
+        with self._lock:
+            rows = self._conn.execute("SELECT url, title FROM articles WHERE content IS NULL").fetchall()
+        return [NewsItem(title, url) for url, title in rows]
+
+    """查詢標題或內文包含任一檢索詞的文章，按發佈時間倒序；since 限定發佈時間下限
+    
+    3 個字符以上的詞走 trigram 索引，更短的詞（如兩字中文詞）退回 LIKE 掃描"""
+    def search(self, terms: List[str], since: Optional[datetime] = None, limit: Optional[int] = None) -> List[NewsItem]:
+        terms = [term for term in dict.fromkeys(terms) if term]
+        if not terms:
+            return []
+        indexed = [term for term in terms if len(term) >= 3] if self.fts_enabled else []
+        conditions = []
+        params = []
+        if indexed:
+            conditions.append("id IN (SELECT rowid FROM articles_fts WHERE articles_fts MATCH ?)")
+            params.append(' OR '.join('"{}"'.format(term.replace('"', '""')) for term in indexed))
+        for term in terms:
+            if term in indexed:
+                continue
+            pattern = '%' + term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+            conditions.append("(title LIKE ? ESCAPE '\\' OR content LIKE ? ESCAPE '\\')")
+            params += [pattern, pattern]
+        
+        sql = f"SELECT url, source, title, publish_time, content FROM articles WHERE ({' OR '.join(conditions)})"
+        if since:
+            sql += " AND julianday(publish_time) >= julianday(?)"
+            params.append(since.isoformat())
+        sql += " ORDER BY julianday(publish_time) DESC"
+        if limit:
+            sql += " LIMIT ?"
+            params.append(limit)
+        
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [NewsItem(title, url, datetime.fromisoformat(publish_time) if publish_time else None, content or '', source)
+                for url, source, title, publish_time, content in rows]
+
+    """列表 URL 的所有回填分片"""
+    def shards(self, news_url: str) -> List[Dict]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT start_page, end_page, next_page, done FROM backfill_shards WHERE news_url = ? ORDER BY start_page",
+                (news_url,)
+            ).fetchall()
+        return [{'start_page': r[0], 'end_page': r[1], 'next_page': r[2], 'done': bool(r[3])} for r in rows]
+
+    """新建回填分片，ranges 爲 [(起始頁, 結束頁), ...]（結束頁不含）"""
+    def create_shards(self, news_url: str, ranges: List[Tuple[int, int]]):
+        with self._lock:
+            with self._conn:
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO backfill_shards VALUES (?, ?, ?, ?, 0)",
+                    ((news_url, start, end, start) for start, end in ranges)
+                )
+
+    """標記分片已完成"""
+    def finish_shard(self, news_url: str, start_page: int):
+        with self._lock:
+            with self._conn:
+                self._conn.execute(
+                    "UPDATE backfill_shards SET done = 1 WHERE news_url = ? AND start_page = ?", (news_url, start_page)
+                )
+
+    """清除列表 URL 的回填斷點（重新回填，已入庫的文章保留）"""
+    def reset_shards(self, news_url: str):
+        with self._lock:
+            with self._conn:
+                self._conn.execute("DELETE FROM backfill_shards WHERE news_url = ?", (news_url,))
+
+
+"""運行指標：計數器、儀表及耗時直方圖，可輸出 Prometheus 文本格式或 JSON 摘要（線程安全）"""
+class Metrics:
+    BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300)
+    
+    HELP = {
+        'gcs_monitor_stage_duration_seconds': '各階段單次調用耗時',
+        'gcs_monitor_stage_items_total': '各階段處理的條目數',
+        'gcs_monitor_http_responses_total': 'HTTP 響應數（按請求類型及狀態碼，error 爲連接錯誤）',
+        'gcs_monitor_bytes_downloaded_total': '下載的響應體字節數',
+        'gcs_monitor_article_cache_total': '內文緩存查詢結果',
+        'gcs_monitor_article_cache_hit_ratio': '最近一輪內文緩存命中率（含重新驗證未變更）',
+        'gcs_monitor_smtp_retries_total': 'SMTP 發送重試次數',
+        'gcs_monitor_emails_total': '郵件投遞結果',
+        'gcs_monitor_notifications_total': '各通知渠道的投遞結果（email / webhook / file）',
+        'gcs_monitor_notify_retries_total': 'Webhook 投遞重試次數',
+        'gcs_monitor_alert_latency_seconds': '通知從寫入發件箱到投遞確認的耗時（按渠道）',
+        'gcs_monitor_http_retries_total': 'HTTP 請求重試次數',
+        'gcs_monitor_concurrency_limit': '自適應併發控制當前的併發上限',
+        'gcs_monitor_http_requests_sent': '累計發出的 HTTP 請求數（按客戶端：requests / httpx / aiohttp）',
+        'gcs_monitor_http_connections_opened': '累計新建的 HTTP 連接數（https 下即 TLS 握手數）',
+        'gcs_monitor_http_connection_reuse_ratio': '複用已有連接的請求比例',
+        'gcs_monitor_plan_total': '內文抓取規劃的決定（fetch / title_changed / revalidate 需抓取，sent / title_match / unsubscribed 跳過）',
+        'gcs_monitor_listing_checks_total': '列表首頁快速檢查結果（unchanged / not_modified / changed / expired：配置變更或超過重新檢查間隔）',
+        'gcs_monitor_article_stream_total': '流式讀取文章頁的結果（complete / truncated / no_region / unterminated）',
+        'gcs_monitor_runs_total': '監控運行次數',
+        'gcs_monitor_last_run_timestamp_seconds': '最近一輪結束時間（Unix 時間戳）',
+    }
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters = {}
+        self.gauges = {}
+        self.histograms = {}
+    
+    @staticmethod
+    def _key(name: str, labels: Dict) -> Tuple:
+        return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+    
+    """計數器累加"""
+    def inc(self, name: str, value: float = 1, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+    
+    """設置儀表值"""
+    def set(self, name: str, value: float, **labels):
+        with self._lock:
+            self.gauges[self._key(name, labels)] = value
+    
+    """記錄一個直方圖觀測值"""
+    def observe(self, name: str, value: float, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            hist = self.histograms.get(key)
+            if hist is None:
+                hist = self.histograms[key] = {'buckets': [0] * len(self.BUCKETS), 'count': 0, 'sum': 0.0, 'max': 0.0}
+            index = bisect.bisect_left(self.BUCKETS, value)
+            if index < len(self.BUCKETS):
+                hist['buckets'][index] += 1
+            hist['count'] += 1
+            hist['sum'] += value
+            hist['max'] = max(hist['max'], value)
+    
+    """記錄代碼塊耗時到 gcs_monitor_stage_duration_seconds"""
+    @contextmanager
+    def time(self, stage: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe('gcs_monitor_stage_duration_seconds', time.perf_counter() - start, stage=stage)
+    
+    @staticmethod
+    def _format_labels(labels: Tuple, extra: Tuple = ()) -> str:
+        labels = labels + extra
+        if not labels:
+            return ''
+        return '{' + ','.join(f'{k}="{v}"' for k, v in labels) + '}'
+    
+    """Prometheus 文本格式（0.0.4）"""
+    def render_prometheus(self) -> str:
+        with self._lock:
+            counters = dict(self.counters)
+            gauges = dict(self.gauges)
+            histograms = {key: dict(hist, buckets=list(hist['buckets'])) for key, hist in self.histograms.items()}
+        
+        lines = []
+        for kind, series in (('counter', counters), ('gauge', gauges)):
+            for name in sorted({name for name, _ in series}):
+                lines.append(f"# HELP {name} {self.HELP.get(name, name)}")
+                lines.append(f"# TYPE {name} {kind}")
+                for (series_name, labels), value in sorted(series.items()):
+                    if series_name == name:
+                        lines.append(f"{name}{self._format_labels(labels)} {value:g}")
+        
+        for name in sorted({name for name, _ in histograms}):
+            lines.append(f"# HELP {name} {self.HELP.get(name, name)}")
+            lines.append(f"# TYPE {name} histogram")
+            for (series_name, labels), hist in sorted(histograms.items()):
+                if series_name != name:
+                    continue
+                cumulative = 0
+                for bound, count in zip(self.BUCKETS, hist['buckets']):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{self._format_labels(labels, (('le', f'{bound:g}'),))} {cumulative}")
+                lines.append(f"{name}_bucket{self._format_labels(labels, (('le', '+Inf'),))} {hist['count']}")
+                lines.append(f"{name}_sum{self._format_labels(labels)} {hist['sum']:.6f}")
+                lines.append(f"{name}_count{self._format_labels(labels)} {hist['count']}")
+        
+        return '\n'.join(lines) + '\n'
+    
+    """按直方圖桶估算分位數（在所在桶內線性插值）"""
+    def _quantile(self, hist: Dict, q: float) -> float:
+        target = q * hist['count']
+        cumulative = 0
+        lower = 0.0
+        for bound, count in zip(self.BUCKETS, hist['buckets']):
+            if count and cumulative + count >= target:
+                return min(lower + (bound - lower) * (target - cumulative) / count, hist['max'])
+            cumulative += count
+            lower = bound
+        return hist['max']
+    
+    """JSON 摘要：{指標名: {"k=v,...": 值}}，直方圖給出次數、總耗時、平均、最大及估算的 p50/p95"""
+    def summary(self) -> Dict:
+        label_str = lambda labels: ','.join(f'{k}={v}' for k, v in labels)
+        result = {'counters': {}, 'gauges': {}, 'histograms': {}}
+        with self._lock:
+            for section, series in (('counters', self.counters), ('gauges', self.gauges)):
+                for (name, labels), value in sorted(series.items()):
+                    result[section].setdefault(name, {})[label_str(labels)] = value
+            for (name, labels), hist in sorted(self.histograms.items()):
+                result['histograms'].setdefault(name, {})[label_str(labels)] = {
+                    'count': hist['count'],
+                    'sum': round(hist['sum'], 6),
+                    'avg': round(hist['sum'] / hist['count'], 6) if hist['count'] else 0,
+                    'max': round(hist['max'], 6),
+                    'p50': round(self._quantile(hist, 0.5), 6),
+                    'p95': round(self._quantile(hist, 0.95), 6)
+                }
+        return result
+    
+    """在後台線程中提供 /metrics 端點，返回 HTTP 服務器（調用 shutdown() 停止）"""
+    def serve(self, host: str, port: int) -> ThreadingHTTPServer:
+        metrics = self
+        
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+            
+            def do_GET(self):
+                if self.path.split('?')[0] not in ('/metrics', '/'):
+                    self.send_error(404)
+                    return
+                body = metrics.render_prometheus().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+        
+        server = ThreadingHTTPServer((host, port), Handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, name='metrics-server', daemon=True).start()
+        return server
+
+
+"""JSON Lines 日誌格式：每條日誌一行 JSON，附帶經 extra 傳入的新聞字段（url、stage、latency 等）"""
+class JsonLogFormatter(logging.Formatter):
+    FIELDS = ('url', 'stage', 'latency', 'result', 'profile')
+    
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'time': datetime.fromtimestamp(record.created).astimezone().isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'thread': record.threadName,
+            'message': record.getMessage()
+        }
+        for field in self.FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exc_info'] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False)
+
+
+"""日誌隊列處理器：調用線程只合併消息參數後入隊，不做格式化；保留 exc_info，
+異常堆棧由後台線程的格式化器輸出（標準 QueueHandler 會在調用線程把堆棧併入消息並清除 exc_info）"""
+class _LogQueueHandler(QueueHandler):
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
 """澳門新聞監控器 """
 class MacauNewsMonitorEmail:
+    LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+    
     """初始化監控器"""
-    def __init__(self, config_file: str = "config_email.json"):
+    def __init__(self, config_file: str = "config_email.json", engine: Optional[str] = None,
+                 full_crawl: bool = False):
+        self.config_file = config_file
         self.config = self._load_config(config_file)
+        self._config_mtime = self._get_config_mtime()
         self._setup_logging()
+        self.metrics = Metrics()
+        self._engine_override = engine
+        self._full_crawl = full_crawl
+        self.engine = self._select_engine()
         self.sent_news = self._load_sent_news()
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-        })
+        self.outbox = self._init_outbox()
+        self.digest = self._init_digest()
+        self._renderers = {}
+        self.transport = HttpTransport(self.config, self.logger, self.metrics)
+        self.article_cache = self._init_article_cache()
+        self.throttle = self._init_throttle()
+        self.article_store = self._init_article_store()
+        self.parser_backend = self._select_parser_backend()
+        self._parse_pool = None
+        self._parse_pool_lock = threading.Lock()
+        self._parse_pool_failed = False
+        # 快速檢查時已抓取的列表首頁，翻頁時直接複用
+        self._prefetched_pages = {}
+        self.crawl_mode = 'full' if full_crawl else self.config.get('crawl_mode', 'incremental')
+        self.checkpoint = self._init_checkpoint()
+        self.matcher = None
+        self._matcher_keywords = None
+        self._keyword_profiles = {}
+        self.delivery = SmtpDelivery(self.config, self.logger, self.metrics)
+        self.channels = self._init_channels()
+        self._notify_pool = None
+        self._notify_futures = {}
+        self._notify_attempted = set()
+        self._sent_lock = threading.Lock()
+        self._pending_keys = set()
+        self._plan_log = []
+
+    """選擇抓取引擎（命令行參數優先），未安裝 aiohttp 時回退到線程引擎"""
+    def _select_engine(self) -> str:
+        engine = self._engine_override or self.config.get('engine', 'threads')
+        if engine == 'async' and aiohttp is None:
+            self.logger.warning("未安裝 aiohttp，異步引擎不可用，改用線程引擎")
+            engine = 'threads'
+        return engine
 
     """加載配置文件"""    
     def _load_config(self, config_file: str) -> dict:
         try:
-            with open(config_file, 'r', encoding='utf-8') as f:
-                return json.load(f)
+            return self._read_config(config_file)
         except FileNotFoundError:
             print(f"錯誤: 配置文件 {config_file} 不存在")
             sys.exit(1)
@@ -44,22 +1813,136 @@ class MacauNewsMonitorEmail:
             print(f"錯誤: 配置文件格式錯誤 - {e}")
             sys.exit(1)
 
-    """設置日誌"""            
+    """讀取配置文件（出錯時拋出異常）"""
+    def _read_config(self, config_file: str) -> dict:
+        with open(config_file, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    """配置文件的修改時間，文件不存在時返回 None"""
+    def _get_config_mtime(self) -> Optional[float]:
+        try:
+            return os.stat(self.config_file).st_mtime
+        except OSError:
+            return None
+
+    """配置文件變更時重新加載，並按需重建受影響的組件；返回是否已重新加載"""
+    def reload_config_if_changed(self) -> bool:
+        mtime = self._get_config_mtime()
+        if mtime is None or mtime == self._config_mtime:
+            return False
+        
+        try:
+            new_config = self._read_config(self.config_file)
+        except (OSError, json.JSONDecodeError) as e:
+            self.logger.error(f"重新加載配置文件失敗，繼續使用原配置: {e}")
+            self._config_mtime = mtime
+            return False
+        
+        # 後台投遞使用的是舊配置的渠道、發件箱及已發送記錄，替換前等待其結束
+        self._stop_notify_pool()
+        old_config, self.config = self.config, new_config
+        self._config_mtime = mtime
+        changed = lambda *keys: any(old_config.get(k) != new_config.get(k) for k in keys)
+        
+        if changed('log_level'):
+            logging.getLogger().setLevel(getattr(logging, new_config.get('log_level', 'INFO')))
+        if changed('engine'):
+            self.engine = self._select_engine()
+        if changed('parser_backend'):
+            self.parser_backend = self._select_parser_backend()
+        if changed('parse_processes'):
+            self._close_parse_pool()
+            self._parse_pool_failed = False
+        if changed('crawl_mode') and not self._full_crawl:
+            self.crawl_mode = new_config.get('crawl_mode', 'incremental')
+        if changed('article_cache_enabled', 'article_cache_file', 'article_cache_ttl', 'article_cache_max_mb'):
+            self.article_cache = self._init_article_cache()
+        if changed('concurrent_requests', 'max_concurrent_requests', 'adaptive_concurrency', 'adaptive_latency_target'):
+            self.throttle = self._init_throttle()
+        if changed('http_pool_size', 'http_connect_timeout', 'http_read_timeout', 'http_keepalive_timeout',
+                   'http_connection_retries', 'http2', 'concurrent_requests', 'max_concurrent_requests'):
+            self.transport.close()
+            self.transport = HttpTransport(self.config, self.logger, self.metrics)
+        if changed('article_index_enabled', 'article_store_file'):
+            self.article_store = self._init_article_store()
+        if changed('sent_news_backend', 'sent_news_db', 'sent_news_file', 'sent_news_ttl_days'):
+            self.sent_news = self._load_sent_news()
+        if changed('crawl_state_file'):
+            self.checkpoint = self._init_checkpoint()
+        if changed('email_outbox_file'):
+            self.outbox = self._init_outbox()
+        if changed('email_digest_file'):
+            self.digest = self._init_digest()
+        # 模板可能按訂閱配置，重新加載後一律重新讀取
+        self._renderers = {}
+        self.delivery.close()
+        self.delivery = SmtpDelivery(self.config, self.logger, self.metrics)
+        self.channels = self._init_channels()
+        
+        self.logger.info(f"檢測到配置文件變更，已重新加載 {self.config_file}")
+        return True
+
+    """設置日誌：log_async 時各線程只把日誌放入隊列，由後台線程格式化並寫入文件及控制台；
+    日誌文件按大小或時間輪轉。與 basicConfig 一樣，根日誌器已有處理器時不再重複配置"""
     def _setup_logging(self):
-        log_level = getattr(logging, self.config.get('log_level', 'INFO'))
-        logging.basicConfig(
-            level=log_level,
-            format='%(asctime)s - %(levelname)s - %(message)s',
-            handlers=[
-                logging.FileHandler('macau_news_monitor_email.log', encoding='utf-8'),
-                logging.StreamHandler()
-            ]
-        )
         self.logger = logging.getLogger(__name__)
+        self._log_listener = None
+        root = logging.getLogger()
+        if root.handlers:
+            return
+        
+        root.setLevel(getattr(logging, self.config.get('log_level', 'INFO')))
+        console = logging.StreamHandler()
+        console.setFormatter(logging.Formatter(self.LOG_FORMAT))
+        handlers = [self._create_log_file_handler(), console]
+        if not self.config.get('log_async', True):
+            for handler in handlers:
+                root.addHandler(handler)
+            return
+        
+        log_queue = queue.SimpleQueue()
+        self._log_listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+        self._log_listener.start()
+        # 退出時先寫完隊列中的日誌
+        atexit.register(self._log_listener.stop)
+        root.addHandler(_LogQueueHandler(log_queue))
+    
+    """日誌文件處理器：log_rotation 爲 size 時按 log_max_mb 輪轉，time 時按 log_rotate_when 輪轉，
+    保留 log_backup_count 個舊文件；log_format 爲 json 時寫 JSON Lines"""
+    def _create_log_file_handler(self) -> logging.Handler:
+        log_file = self.config.get('log_file', 'macau_news_monitor_email.log')
+        rotation = self.config.get('log_rotation', 'size')
+        backup_count = self.config.get('log_backup_count', 5)
+        if rotation == 'size':
+            handler = RotatingFileHandler(log_file, maxBytes=int(self.config.get('log_max_mb', 10) * 1024 * 1024),
+                                          backupCount=backup_count, encoding='utf-8')
+        elif rotation == 'time':
+            handler = TimedRotatingFileHandler(log_file, when=self.config.get('log_rotate_when', 'midnight'),
+                                               backupCount=backup_count, encoding='utf-8')
+        else:
+            handler = logging.FileHandler(log_file, encoding='utf-8')
+        
+        if self.config.get('log_format', 'text') == 'json':
+            handler.setFormatter(JsonLogFormatter())
+        else:
+            handler.setFormatter(logging.Formatter(self.LOG_FORMAT))
+        return handler
+    
+    """記錄單篇新聞的處理結果（debug 級別），JSON 日誌中附帶 url、stage、latency、result 字段"""
+    def _log_article(self, url: str, stage: str, latency: float, result: str):
+        self.logger.debug(f"{stage} {result} {latency * 1000:.0f}ms {url}",
+                          extra={'url': url, 'stage': stage, 'latency': round(latency, 4), 'result': result})
 
-    """加載已發送的新聞記錄"""        
-    def _load_sent_news(self) -> Set[str]:
+    """加載已發送的新聞記錄（sqlite 後端爲索引存儲，json 後端爲整文件讀入的集合）"""
+    def _load_sent_news(self):
         sent_file = self.config.get('sent_news_file', 'sent_news_email.json')
+        
+        if self.config.get('sent_news_backend', 'sqlite') == 'sqlite':
+            try:
+                return self._open_sent_news_store(sent_file)
+            except sqlite3.Error as e:
+                self.logger.warning(f"打開已發送記錄數據庫失敗，改用 json 文件: {e}")
+        
         if os.path.exists(sent_file):
             try:
                 with open(sent_file, 'r', encoding='utf-8') as f:
@@ -69,8 +1952,30 @@ class MacauNewsMonitorEmail:
                 self.logger.warning(f"加載已發送記錄失敗: {e}")
         return set()
     
-    """保存已發送的新聞記錄"""   
+    """打開 SQLite 去重存儲，首次使用時從舊版 json 文件遷移，並清理過期記錄"""
+    def _open_sent_news_store(self, sent_file: str) -> SentNewsStore:
+        store = SentNewsStore(self.config.get('sent_news_db', 'sent_news.db'))
+        
+        if os.path.exists(sent_file):
+            try:
+                count = store.migrate_from_json(sent_file)
+                os.replace(sent_file, sent_file + '.migrated')
+                self.logger.info(f"已從 {sent_file} 遷移 {count} 條已發送記錄")
+            except Exception as e:
+                self.logger.warning(f"遷移已發送記錄失敗: {e}")
+        
+        ttl_days = self.config.get('sent_news_ttl_days', 90)
+        if ttl_days:
+            expired = store.expire(ttl_days)
+            if expired:
+                self.logger.info(f"已清理 {expired} 條超過 {ttl_days} 天的已發送記錄")
+        
+        return store
+    
+    """保存已發送的新聞記錄（sqlite 後端寫入時已提交，無需整文件重寫）"""   
     def _save_sent_news(self):
+        if isinstance(self.sent_news, SentNewsStore):
+            return
         sent_file = self.config.get('sent_news_file', 'sent_news_email.json')
         try:
             with open(sent_file, 'w', encoding='utf-8') as f:
@@ -81,179 +1986,538 @@ class MacauNewsMonitorEmail:
         except Exception as e:
             self.logger.error(f"保存已發送記錄失敗: {e}")
     
-    """抓取指定頁面的新聞列表"""
-    def fetch_page(self, page_num: int = 0) -> List[Dict[str, str]]:
-        news_url = self.config.get('news_url', 'https://www.gcs.gov.mo/list/zh-hant/news/')
-        
+    """加載郵件發件箱"""
+    def _init_outbox(self) -> EmailOutbox:
+        outbox = EmailOutbox(self.config.get('email_outbox_file', 'email_outbox.json'))
+        try:
+            outbox.load()
+        except Exception as e:
+            self.logger.warning(f"加載郵件發件箱失敗: {e}")
+        return outbox
+    
+    """初始化郵件摘要緩衝"""
+    def _init_digest(self) -> EmailDigest:
+        digest = EmailDigest(self.config.get('email_digest_file', 'email_digest.json'))
+        try:
+            digest.load()
+        except Exception as e:
+            self.logger.warning(f"加載郵件摘要失敗: {e}")
+        return digest
+    
+    """初始化文章內文緩存"""
+    def _init_article_cache(self) -> Optional[ArticleCache]:
+        if not self.config.get('article_cache_enabled', True):
+            return None
+        cache_file = self.config.get('article_cache_file', 'article_cache.db')
+        try:
+            return ArticleCache(
+                cache_file,
+                ttl=self.config.get('article_cache_ttl', 21600),
+                max_bytes=int(self.config.get('article_cache_max_mb', 50) * 1024 * 1024)
+            )
+        except sqlite3.Error as e:
+            self.logger.warning(f"初始化內文緩存失敗，將不使用緩存: {e}")
+            return None
+
+    """初始化自適應併發控制；adaptive_concurrency 關閉時併發數固定爲 concurrent_requests"""
+    def _init_throttle(self) -> AdaptiveConcurrency:
+        initial = self.config.get('concurrent_requests', 5)
+        max_limit = self.config.get('max_concurrent_requests', 20) if self.config.get('adaptive_concurrency', True) else initial
+        return AdaptiveConcurrency(
+            initial,
+            max_limit=max_limit,
+            min_limit=1 if max_limit > initial else initial,
+            latency_target=self.config.get('adaptive_latency_target', 2.0)
+        )
+    
+    """打開本地文章庫（全文索引）；article_index_enabled 關閉時不保存抓取過的文章"""
+    def _init_article_store(self) -> Optional[ArticleStore]:
+        if not self.config.get('article_index_enabled', True):
+            return None
+        try:
+            store = self._open_article_store()
+        except sqlite3.Error as e:
+            self.logger.warning(f"打開本地文章庫失敗，將不保存抓取過的文章: {e}")
+            return None
+        if not store.fts_enabled:
+            self.logger.warning("當前 SQLite 不支持 FTS5 trigram 分詞，文章查詢將使用 LIKE 掃描")
+        return store
+    
+    """加載增量抓取檢查點"""
+    def _init_checkpoint(self) -> CrawlCheckpoint:
+        state_file = self.config.get('crawl_state_file', 'crawl_state.json')
+        checkpoint = CrawlCheckpoint(state_file)
+        try:
+            checkpoint.load()
+        except Exception as e:
+            self.logger.warning(f"加載抓取檢查點失敗，本輪將完整抓取: {e}")
+        return checkpoint
+    
+    """增量模式下判斷是否已到達上次抓取的位置，可停止翻頁"""
+    def _reached_checkpoint(self, news_url: str, news_list: List[NewsItem]) -> bool:
+        return self.crawl_mode == 'incremental' and self.checkpoint.reached(news_url, news_list)
+    
+    """新聞來源列表；未配置 sources 時使用頂層 news_url 作爲唯一來源"""
+    def _get_sources(self) -> List[Dict]:
+        sources = self.config.get('sources')
+        if not sources:
+            return [{'name': 'default', 'news_url': self.config.get('news_url', 'https://www.gcs.gov.mo/list/zh-hant/news/')}]
+        return [dict(source, name=source.get('name') or source['news_url']) for source in sources]
+    
+    """訂閱配置列表（關鍵詞 → 收件人）；未配置 profiles 時使用頂層 keywords / email_to 作爲默認訂閱"""
+    def _get_profiles(self) -> List[Dict]:
+        profiles = self.config.get('profiles')
+        if not profiles:
+            return [{
+                'name': 'default',
+                'keywords': self.config.get('keywords', []),
+                'email_to': self.config.get('email_to', []),
+                'email_subject_prefix': self.config.get('email_subject_prefix', '【澳門新聞監控】'),
+                'email_title': self.config.get('email_title', '軍團菌相關新聞')
+            }]
+        return [dict(profile, name=profile.get('name') or f"profile-{i}") for i, profile in enumerate(profiles, 1)]
+    
+    """訂閱的新聞主題（用於郵件標題）：未設置 email_title 時使用訂閱名"""
+    def _email_title(self, profile: Dict) -> str:
+        return profile.get('email_title') or f"「{profile['name']}」相關新聞"
+    
+    """已發送記錄的鍵：默認訂閱沿用 URL，其他訂閱以「訂閱名|URL」區分"""
+    def _sent_key(self, profile: Dict, url: str) -> str:
+        if profile['name'] == 'default':
+            return url
+        return f"{profile['name']}|{url}"
+    
+    """通知渠道：email（SMTP）、webhook（HTTP POST JSON）、file（追加 JSONL），各自獨立的超時及重試狀態"""
+    def _init_channels(self) -> Dict[str, object]:
+        return {
+            'email': SmtpChannel(self.delivery),
+            'webhook': WebhookChannel(self.config, self.logger, self.metrics),
+            'file': FileChannel()
+        }
+    
+    """訂閱使用的通知渠道：訂閱的 channels 優先，其次 notify_channels，未配置時只發郵件"""
+    def _profile_channels(self, profile: Dict) -> List[str]:
+        names = profile.get('channels') or self.config.get('notify_channels') or ['email']
+        return [name for name in names if name in self.channels] or ['email']
+    
+    """某個渠道的已發送記錄鍵：郵件沿用訂閱的鍵（與已有記錄兼容），其他渠道加上「渠道#」前綴"""
+    def _channel_key(self, channel: str, sent_key: str) -> str:
+        return sent_key if channel == 'email' else f"{channel}#{sent_key}"
+    
+    """新聞在訂閱各渠道的已發送記錄鍵（第一個渠道的記錄保存內容指紋）；所有鍵都已記錄纔算已發送，
+    任一鍵在發件箱或摘要中即爲等待發送"""
+    def _delivery_keys(self, profile: Dict, url: str) -> List[str]:
+        sent_key = self._sent_key(profile, url)
+        return [self._channel_key(channel, sent_key) for channel in self._profile_channels(profile)]
+    
+    """列表頁 URL（第 0 頁爲首頁，其後爲分頁請求）"""
+    def _page_url(self, news_url: str, page_num: int) -> str:
         if page_num == 0:
-            url = news_url
-        else:
-            url = f"{news_url}?0-1.0-infoContent-infoTable-nextItems&nextPage={page_num}"
+            return news_url
+        return f"{news_url}?0-1.0-infoContent-infoTable-nextItems&nextPage={page_num}"
+    
+    """選擇解析後端：auto 時優先 selectolax，其次 lxml，未安裝時回退 BeautifulSoup"""
+    def _select_parser_backend(self) -> str:
+        backend = self.config.get('parser_backend', 'bs4')
+        available = available_parser_backends()
+        if backend == 'auto':
+            return available[-1]
+        if backend not in available:
+            self.logger.warning(f"解析後端 {backend} 不可用，改用 bs4")
+            return 'bs4'
+        return backend
+    
+    """使用配置的解析後端執行解析，快速後端出錯時回退到 BeautifulSoup"""
+    def _parse_with_backend(self, kind: int, html: str) -> list:
+        if self.parser_backend != 'bs4':
+            try:
+                return PARSER_BACKENDS[self.parser_backend][kind](html)
+            except Exception as e:
+                self.logger.debug(f"{self.parser_backend} 解析失敗，回退到 bs4: {e}")
+        return PARSER_BACKENDS['bs4'][kind](html)
+    
+    """解析新聞列表頁 HTML"""
+    def _parse_listing(self, html: str, news_url: str) -> List[NewsItem]:
+        news_list = []
+        
+        for title, href, datetime_str in self._parse_with_backend(0, html):
+            try:
+                if not title or not href:
+                    continue
+                
+                url = urljoin(news_url, href)
+                
+                if ';jsessionid=' in url:
+                    url = url.split(';jsessionid=')[0]
+                
+                publish_time = None
+                if datetime_str:
+                    try:
+                        publish_time = datetime.fromisoformat(datetime_str.replace('+0800', '+08:00'))
+                    except Exception as e:
+                        self.logger.debug(f"解析日期失敗 {datetime_str}: {e}")
+                
+                news_list.append(NewsItem(title, url, publish_time))
+                
+            except Exception as e:
+                self.logger.warning(f"解析新聞項失敗: {e}")
+                continue
+        
+        return news_list
+    
+    """抓取指定頁面的新聞列表"""
+    def fetch_page(self, page_num: int = 0, news_url: Optional[str] = None) -> List[NewsItem]:
+        news_url = news_url or self._get_sources()[0]['news_url']
+        if page_num == 0 and news_url in self._prefetched_pages:
+            return self._prefetched_pages.pop(news_url)
+        url = self._page_url(news_url, page_num)
         
         self.logger.debug(f"正在抓取第 {page_num + 1} 頁: {url}")
         
-        try:
-            response = self.session.get(url, timeout=30)
-            response.raise_for_status()
-            response.encoding = 'utf-8'
-            
-            soup = BeautifulSoup(response.text, 'html.parser')
-            news_list = []
-            
-            news_items = soup.find_all('tr', class_='infiniteItem')
-            
-            for item in news_items:
+        with self.metrics.time('fetch_page'):
+            try:
+                response = self._request(url, 'listing')
+                response.raise_for_status()
+                response.encoding = 'utf-8'
+                
+                news_list = self._parse_listing(response.text, news_url)
+                self.metrics.inc('gcs_monitor_stage_items_total', len(news_list), stage='fetch_page')
+                return news_list
+                
+            except requests.RequestException as e:
+                self.logger.error(f"抓取第 {page_num + 1} 頁失敗: {e}")
+                return []
+            except Exception as e:
+                self.logger.error(f"解析第 {page_num + 1} 頁失敗: {e}")
+                return []
+    
+    """發送 GET 請求：經自適應併發控制限流，429/5xx/超時按指數退避加隨機抖動重試（遵守 Retry-After）；
+    重試用盡後拋出最後一次的異常，其他狀態碼原樣返回"""
+    def _request(self, url: str, kind: str, headers: Optional[Dict[str, str]] = None, stream: bool = False) -> requests.Response:
+        max_retries = self.config.get('fetch_max_retries', 3)
+        
+        for attempt in range(max_retries + 1):
+            retry_after = None
+            with self.throttle:
+                start = time.perf_counter()
                 try:
-                    h5 = item.find('h5')
-                    if not h5:
-                        continue
-                    
-                    title = h5.get_text(strip=True)
-                    if not title:
-                        continue
-                    
-                    link_tag = item.find('a', href=lambda x: x and '/detail/' in x)
-                    if not link_tag:
-                        continue
-                    
-                    href = link_tag.get('href', '')
-                    if not href:
-                        continue
-                    
-                    url = urljoin(news_url, href)
-                    
-                    if ';jsessionid=' in url:
-                        url = url.split(';jsessionid=')[0]
-                    
-                    publish_time = None
-                    time_tag = item.find('time', class_='render_timeago_css')
-                    if time_tag and time_tag.get('datetime'):
-                        try:
-                            datetime_str = time_tag.get('datetime')
-                            publish_time = datetime.fromisoformat(datetime_str.replace('+0800', '+08:00'))
-                        except Exception as e:
-                            self.logger.debug(f"解析日期失敗 {datetime_str}: {e}")
-                    
-                    news_list.append({
-                        'title': title,
-                        'url': url,
-                        'publish_time': publish_time,
-                        'content': None
-                    })
-                    
-                except Exception as e:
-                    self.logger.warning(f"解析新聞項失敗: {e}")
-                    continue
-            
-            return news_list
+                    response = self.transport.get(url, headers=headers, stream=stream)
+                except (requests.ConnectionError, requests.Timeout) as e:
+                    self._record_response(kind, 'error')
+                    self.throttle.on_overload()
+                    error = e
+                else:
+                    # 流式請求的下載字節數在讀取響應體時記錄
+                    self._record_response(kind, response.status_code, 0 if stream else len(response.content))
+                    if not _is_retryable_status(response.status_code):
+                        self.throttle.on_success(time.perf_counter() - start)
+                        self.metrics.set('gcs_monitor_concurrency_limit', self.throttle.limit)
+                        return response
+                    retry_after = _parse_retry_after(response.headers.get('Retry-After'))
+                    response.close()
+                    self.throttle.on_overload(retry_after)
+                    error = requests.HTTPError(f"{response.status_code} 響應: {url}", response=response)
             
-        except requests.RequestException as e:
-            self.logger.error(f"抓取第 {page_num + 1} 頁失敗: {e}")
-            return []
-        except Exception as e:
-            self.logger.error(f"解析第 {page_num + 1} 頁失敗: {e}")
-            return []
+            self.metrics.set('gcs_monitor_concurrency_limit', self.throttle.limit)
+            if attempt == max_retries:
+                raise error
+            delay = self._retry_delay(attempt, retry_after)
+            self.metrics.inc('gcs_monitor_http_retries_total', kind=kind)
+            self.logger.debug(f"請求失敗，{delay:.1f} 秒後重試 ({attempt + 1}/{max_retries}): {error}")
+            time.sleep(delay)
+    
+    """第 attempt 次重試前的等待秒數：指數退避加隨機抖動，且不短於 Retry-After"""
+    def _retry_delay(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        backoff = self.config.get('fetch_retry_delay', 1) * (2 ** attempt)
+        return max(retry_after or 0.0, backoff * random.uniform(0.5, 1.0))
+    
+    """是否爲重試用盡的暫時性錯誤（連接錯誤、超時、429/5xx）"""
+    def _is_transient_error(self, e: Exception) -> bool:
+        transient = (requests.ConnectionError, requests.Timeout, asyncio.TimeoutError)
+        if aiohttp is not None:
+            transient += (aiohttp.ClientConnectionError,)
+        if isinstance(e, transient):
+            return True
+        response = getattr(e, 'response', None)
+        if response is not None and _is_retryable_status(response.status_code):
+            return True
+        status = getattr(e, 'status', None)
+        return isinstance(status, int) and _is_retryable_status(status)
     
-    """抓取多頁新聞列表，並過濾一天內的新聞"""
-    def fetch_all_pages(self) -> List[Dict[str, str]]:
+    """記錄 HTTP 響應狀態及下載字節數"""
+    def _record_response(self, kind: str, status, size: int = 0):
+        self.metrics.inc('gcs_monitor_http_responses_total', kind=kind, status=status)
+        if size:
+            self.metrics.inc('gcs_monitor_bytes_downloaded_total', size, kind=kind)
+    
+    """逐頁抓取一個來源的新聞列表，每頁解析後立即產出該頁中去重後的近期新聞
+    
+    seen 在多個來源之間共享時，同一 URL 只會被產出一次"""
+    def iter_pages(self, source: Optional[Dict] = None, seen: Optional[Set[str]] = None) -> Iterator[List[NewsItem]]:
+        source = source or self._get_sources()[0]
+        seen = set() if seen is None else seen
         max_pages = self.config.get('max_pages', 10)
         days_to_check = self.config.get('days_to_check', 1)
-        all_news = []
         
         cutoff_time = datetime.now(timezone.utc) - timedelta(days=days_to_check)
+        total_count = 0
+        unique_count = 0
+        recent_count = 0
         
-        self.logger.info(f"開始抓取最多 {max_pages} 頁新聞（只保留 {days_to_check} 天內的新聞）...")
+        news_url = source['news_url']
+        label = self._source_label(source)
+        self.logger.info(f"{label}開始抓取最多 {max_pages} 頁新聞（只保留 {days_to_check} 天內的新聞）...")
         
         for page in range(max_pages):
-            news_list = self.fetch_page(page)
+            news_list = self.fetch_page(page, news_url)
             
             if not news_list:
-                self.logger.info(f"第 {page + 1} 頁無新聞，停止抓取")
+                self.logger.info(f"{label}第 {page + 1} 頁無新聞，停止抓取")
                 break
             
-            old_news_count = 0
-            for news in news_list:
-                if news.get('publish_time'):
-                    if news['publish_time'] < cutoff_time:
-                        old_news_count += 1
+            seen_before = len(seen)
+            recent_news, old_news_count = self._screen_page(news_list, seen, cutoff_time, source)
+            total_count += len(news_list)
+            unique_count += len(seen) - seen_before
+            recent_count += len(recent_news)
+            self.logger.info(f"{label}第 {page + 1} 頁: {len(news_list)} 條新聞 ({old_news_count} 條超過 {days_to_check} 天)")
             
-            all_news.extend(news_list)
-            self.logger.info(f"第 {page + 1} 頁: {len(news_list)} 條新聞 ({old_news_count} 條超過 {days_to_check} 天)")
+            if recent_news:
+                yield recent_news
             
             if old_news_count >= len(news_list) * 0.8:
-                self.logger.info(f"第 {page + 1} 頁大部分新聞已超過 {days_to_check} 天，停止抓取")
+                self.logger.info(f"{label}第 {page + 1} 頁大部分新聞已超過 {days_to_check} 天，停止抓取")
+                break
+            
+            if self._reached_checkpoint(news_url, news_list):
+                self.logger.info(f"{label}第 {page + 1} 頁已到達上次抓取的位置，停止抓取（增量模式）")
                 break
             
             if page < max_pages - 1:
-                time.sleep(1)
-        
-        seen = {}
-        for news in all_news:
-            if news['url'] not in seen:
-                seen[news['url']] = news
-        
-        unique_news = list(seen.values())
+                time.sleep(self.config.get('page_delay', 1))
         
+        self.logger.info(f"{label}共抓取 {total_count} 條新聞，去重後 {unique_count} 條，{days_to_check} 天內新聞 {recent_count} 條")
+    
+    """日誌中的來源前綴（單一默認來源時爲空）"""
+    def _source_label(self, source: Dict) -> str:
+        return '' if source['name'] == 'default' else f"[{source['name']}] "
+    
+    """篩選一頁新聞：跳過已出現的 URL，返回近期新聞及該頁超期新聞數"""
+    def _screen_page(self, news_list: List[NewsItem], seen: Set[str], cutoff_time: datetime,
+                     source: Optional[Dict] = None):
         recent_news = []
-        for news in unique_news:
-            if news.get('publish_time'):
-                if news['publish_time'] >= cutoff_time:
-                    recent_news.append(news)
-            else:
+        old_news_count = 0
+        for news in news_list:
+            is_old = bool(news.publish_time) and news.publish_time < cutoff_time
+            if is_old:
+                old_news_count += 1
+            if news.url in seen:
+                continue
+            seen.add(news.url)
+            if source:
+                news.source = source['name']
+            if not is_old:
                 recent_news.append(news)
-        
-        self.logger.info(f"共抓取 {len(all_news)} 條新聞，去重後 {len(unique_news)} 條，{days_to_check} 天內新聞 {len(recent_news)} 條")
-        
-        return recent_news
+        return recent_news, old_news_count
+    
+    """抓取所有來源的多頁新聞列表，並過濾一天內的新聞（跨來源按 URL 去重）"""
+    def fetch_all_pages(self) -> List[NewsItem]:
+        seen = set()
+        return [news for source in self._get_sources()
+                for page_news in self.iter_pages(source, seen) for news in page_news]
+    
+    """從文章頁面 HTML 中抽取內文"""
+    def _extract_article_text(self, html: str) -> str:
+        content_text = ' '.join(self._parse_with_backend(1, html))
+        return ' '.join(content_text.split())
+    
+    """在當前線程抽取內文；page 爲流式讀取結果時只解析正文區域，區域中沒有可用段落時解析已讀取的全部內容"""
+    def _extract_local(self, page) -> str:
+        if isinstance(page, ArticleStreamReader):
+            return self._extract_article_text(page.region()) or self._extract_article_text(page.document())
+        return self._extract_article_text(page)
+    
+    """解析進程池的任務參數"""
+    def _extract_args(self, page) -> tuple:
+        if isinstance(page, ArticleStreamReader):
+            return bytes(page.buffer[:page.max_bytes]), page.start, page.end, self.parser_backend
+        return page, None, None, self.parser_backend
+    
+    """抽取內文（page 爲流式讀取結果或完整 HTML）：配置了 parse_processes 時交給解析進程池，
+    抓取線程只負責下載並等待結果，解析不再受 GIL 限制"""
+    def _extract_content(self, page) -> str:
+        pool = self._get_parse_pool()
+        if pool is not None:
+            try:
+                return pool.submit(extract_article_content, *self._extract_args(page)).result()
+            except BrokenProcessPool as e:
+                self._disable_parse_pool(e)
+        return self._extract_local(page)
     
-    """抓取單篇新聞的內文"""
-    def fetch_article_content(self, url: str) -> str:
+    """異步引擎抽取內文：解析進程池的結果以 Future 等待，不阻塞事件循環"""
+    async def _extract_content_async(self, page) -> str:
+        pool = self._get_parse_pool()
+        if pool is not None:
+            try:
+                return await asyncio.wrap_future(pool.submit(extract_article_content, *self._extract_args(page)))
+            except BrokenProcessPool as e:
+                self._disable_parse_pool(e)
+        return self._extract_local(page)
+    
+    """解析進程池（parse_processes 爲 0 時不使用），首次使用時創建，常駐模式下跨輪複用"""
+    def _get_parse_pool(self) -> Optional[ProcessPoolExecutor]:
+        processes = self.config.get('parse_processes', 0)
+        if not processes or self._parse_pool_failed:
+            return None
+        with self._parse_pool_lock:
+            if self._parse_pool is None:
+                self._parse_pool = ProcessPoolExecutor(max_workers=processes)
+                self.logger.info(f"已啓動 {processes} 個內文解析進程")
+            return self._parse_pool
+    
+    """解析進程異常退出後關閉進程池，本次運行改爲在抓取線程中解析"""
+    def _disable_parse_pool(self, error: Exception):
+        with self._parse_pool_lock:
+            if self._parse_pool_failed:
+                return
+            self._parse_pool_failed = True
+        self.logger.warning(f"解析進程池不可用，改爲在抓取線程中解析: {error}")
+        self._close_parse_pool()
+    
+    def _close_parse_pool(self):
+        with self._parse_pool_lock:
+            pool, self._parse_pool = self._parse_pool, None
+        if pool is not None:
+            pool.shutdown(wait=False)
+    
+    """流式讀取文章頁響應體，讀到正文結束或達到 article_max_bytes 即停止"""
+    def _read_article_stream(self, response: requests.Response) -> ArticleStreamReader:
+        reader = ArticleStreamReader(self.config.get('article_max_bytes', 2 * 1024 * 1024))
+        chunks = response.iter_content(chunk_size=16384)
+        for chunk in chunks:
+            if reader.feed(chunk):
+                break
+        size = len(reader.buffer)
+        if reader.end is not None:
+            for chunk in chunks:
+                size += len(chunk)
+                if size - len(reader.buffer) >= reader.DRAIN_LIMIT:
+                    break
+        self._record_stream(reader, size)
+        return reader
+    
+    """記錄流式讀取的下載字節數及結果"""
+    def _record_stream(self, reader: ArticleStreamReader, size: int):
+        self.metrics.inc('gcs_monitor_bytes_downloaded_total', size, kind='article')
+        self.metrics.inc('gcs_monitor_article_stream_total', result=reader.status)
+        if reader.truncated:
+            self.logger.debug(f"文章頁超過 {reader.max_bytes} 字節，只解析已讀取的部分")
+    
+    """根據緩存條目構建條件請求頭"""
+    def _conditional_headers(self, entry: Optional[Dict]) -> Dict[str, str]:
+        headers = {}
+        if entry:
+            if entry['etag']:
+                headers['If-None-Match'] = entry['etag']
+            if entry['last_modified']:
+                headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+    
+    """查詢內文緩存，返回 (可直接使用的內文, 需重新驗證的緩存條目)；
+    列表頁標題與緩存時不同說明文章已被修改，此時不使用緩存也不發條件請求"""
+    def _lookup_cache(self, url: str, title: Optional[str] = None) -> Tuple[Optional[str], Optional[Dict]]:
+        cache = self.article_cache
+        entry = cache.get(url) if cache else None
+        if not entry:
+            return None, None
+        if title and entry['title'] and entry['title'] != title:
+            self.logger.info(f"列表頁標題已變更，重新抓取內文: {entry['title']} → {title}",
+                             extra={'url': url, 'stage': 'fetch_article_content'})
+            return None, None
+        if cache.is_fresh(entry):
+            cache.record('hits')
+            cache.touch(url)
+            return entry['content'], entry
+        return None, entry
+    
+    """抓取單篇新聞的內文（優先使用緩存，過期條目以條件請求重新驗證）；暫時性錯誤重試用盡後返回 None"""
+    def fetch_article_content(self, url: str, title: Optional[str] = None) -> Optional[str]:
+        start = time.perf_counter()
+        with self.metrics.time('fetch_article_content'):
+            content = self._fetch_article_content(url, title)
+        self.metrics.inc('gcs_monitor_stage_items_total', stage='fetch_article_content')
+        self._log_article(url, 'fetch_article_content', time.perf_counter() - start, self._content_result(content))
+        return content
+    
+    """內文抓取結果：ok / empty（非暫時性錯誤或無正文）/ failed（暫時性錯誤重試用盡）"""
+    @staticmethod
+    def _content_result(content: Optional[str]) -> str:
+        if content is None:
+            return 'failed'
+        return 'ok' if content else 'empty'
+    
+    def _fetch_article_content(self, url: str, title: Optional[str] = None) -> Optional[str]:
+        cache = self.article_cache
+        content, entry = self._lookup_cache(url, title)
+        if content is not None:
+            return content
+        
         try:
-            response = self.session.get(url, timeout=30)
-            response.raise_for_status()
-            response.encoding = 'utf-8'
-            
-            soup = BeautifulSoup(response.text, 'html.parser')
-            
-            content_parts = []
-            
-            paragraphs = soup.find_all('p')
-            for p in paragraphs:
-                text = p.get_text(strip=True)
-                if len(text) > 20 and not text.startswith('跳至'):
-                    content_parts.append(text)
+            stream = self.config.get('article_stream', True)
+            response = self._request(url, 'article', self._conditional_headers(entry), stream=stream)
             
-            if not content_parts:
-                main_content = soup.find('main') or soup.find('article') or soup.find('div', class_='content')
-                if main_content:
-                    content_parts.append(main_content.get_text(separator=' ', strip=True))
+            with response:
+                if response.status_code == 304 and entry:
+                    cache.record('revalidated')
+                    cache.touch(url, fetched=True)
+                    return entry['content']
+                
+                response.raise_for_status()
+                
+                if stream:
+                    reader = self._read_article_stream(response)
+                else:
+                    response.encoding = 'utf-8'
+                    html = response.text
             
-            if not content_parts:
-                og_desc = soup.find('meta', property='og:description')
-                if og_desc and og_desc.get('content'):
-                    content_parts.append(og_desc.get('content'))
+            # 連接釋放回連接池後再解析
+            content_text = self._extract_content(reader if stream else html)
             
-            content_text = ' '.join(content_parts)
-            content_text = ' '.join(content_text.split())
+            if cache:
+                cache.record('misses')
+                cache.put(url, content_text, response.headers.get('ETag'), response.headers.get('Last-Modified'), title)
             
             return content_text
             
         except Exception as e:
-            self.logger.debug(f"抓取內文失敗 {url}: {e}")
+            if self._is_transient_error(e):
+                self.logger.warning(f"抓取內文失敗（已重試 {self.config.get('fetch_max_retries', 3)} 次）{url}: {e}",
+                                    extra={'url': url, 'stage': 'fetch_article_content'})
+                return None
+            self.logger.debug(f"抓取內文失敗 {url}: {e}", extra={'url': url, 'stage': 'fetch_article_content'})
             return ""
     
+    """寫入抓取結果；抓取失敗時內文記爲空並標記 content_failed，本輪只按標題匹配"""
+    def _set_content(self, news: NewsItem, content: Optional[str]):
+        news.content = content or ""
+        if content is None:
+            news.content_failed = True
+    
     """併發抓取多個新聞的內文"""
-    def fetch_contents_concurrent(self, news_list: List[Dict]) -> List[Dict]:
+    def fetch_contents_concurrent(self, news_list: List[NewsItem]) -> List[NewsItem]:
         if not self.config.get('check_content', True):
             self.logger.info("配置爲不檢查內文，跳過內文抓取")
             return news_list
         
-        max_workers = self.config.get('concurrent_requests', 5)
-        self.logger.info(f"開始併發抓取 {len(news_list)} 條新聞內文（併發數: {max_workers}）...")
+        max_workers = self.throttle.max_limit
+        self.logger.info(f"開始併發抓取 {len(news_list)} 條新聞內文（併發數: {int(self.throttle.limit)}，上限: {max_workers}）...")
+        
+        if self.article_cache:
+            self.article_cache.reset_stats()
         
         with ThreadPoolExecutor(max_workers=max_workers) as executor:
             future_to_news = {
-                executor.submit(self.fetch_article_content, news['url']): news
+                executor.submit(self.fetch_article_content, news.url, news.title): news
                 for news in news_list
             }
             
@@ -261,141 +2525,505 @@ class MacauNewsMonitorEmail:
             for future in as_completed(future_to_news):
                 news = future_to_news[future]
                 try:
-                    content = future.result()
-                    news['content'] = content
+                    self._set_content(news, future.result())
                     completed += 1
                     if completed % 10 == 0:
                         self.logger.info(f"已完成 {completed}/{len(news_list)} 條")
                 except Exception as e:
                     self.logger.warning(f"獲取內文失敗: {e}")
-                    news['content'] = ""
+                    news.content = ""
         
-        self.logger.info(f"內文抓取完成: {len(news_list)} 條")
+        self.logger.info(f"內文抓取完成: {len(news_list)} 條（併發上限調整爲 {self.throttle.limit:.1f}）")
+        self._log_cache_stats()
         return news_list
     
-    """過濾包含關鍵詞的新聞（標題或內文）"""
-    def filter_news(self, news_list: List[Dict[str, str]]) -> List[Dict[str, str]]:
-        keywords = self.config.get('keywords', [])
-        filtered = []
+    """記錄內文緩存命中情況並執行容量淘汰"""
+    def _log_cache_stats(self):
+        cache = self.article_cache
+        if not cache:
+            return
+        self.logger.info(f"內文緩存: 命中 {cache.hits} 條，重新驗證未變更 {cache.revalidated} 條，下載 {cache.misses} 條")
+        for result, count in (('hit', cache.hits), ('revalidated', cache.revalidated), ('miss', cache.misses)):
+            self.metrics.inc('gcs_monitor_article_cache_total', count, result=result)
+        total = cache.hits + cache.revalidated + cache.misses
+        if total:
+            self.metrics.set('gcs_monitor_article_cache_hit_ratio', (cache.hits + cache.revalidated) / total)
+        try:
+            evicted = cache.evict()
+            if evicted:
+                self.logger.info(f"內文緩存超出容量上限，已淘汰 {evicted} 條")
+        except sqlite3.Error as e:
+            self.logger.warning(f"內文緩存淘汰失敗: {e}")
+    
+    """異步引擎：在單個事件循環中流式抓取列表頁和文章內文"""
+    def crawl_async(self, on_item: Optional[Callable[[NewsItem], None]] = None, plan: bool = False) -> List[NewsItem]:
+        return asyncio.run(self._crawl_async(on_item, plan))
+    
+    async def _crawl_async(self, on_item: Optional[Callable[[NewsItem], None]] = None, plan: bool = False) -> List[NewsItem]:
+        max_pages = self.config.get('max_pages', 10)
+        profiles = self._get_profiles()
+        days_to_check = self.config.get('days_to_check', 1)
+        check_content = self.config.get('check_content', True)
+        concurrency = self.config.get('async_concurrency', 20)
+        max_retries = self.config.get('fetch_max_retries', 3)
+        stream_articles = self.config.get('article_stream', True)
+        max_bytes = self.config.get('article_max_bytes', 2 * 1024 * 1024)
+        cutoff_time = datetime.now(timezone.utc) - timedelta(days=days_to_check)
         
-        for news in news_list:
-            text_to_search = news['title']
-            if news.get('content'):
-                text_to_search += ' ' + news['content']
+        semaphore = asyncio.Semaphore(concurrency)
+        rate_limiter = AsyncHostRateLimiter(self.config.get('per_host_rate', 5))
+        connector = aiohttp.TCPConnector(limit=concurrency, limit_per_host=concurrency,
+                                         keepalive_timeout=self.transport.keepalive)
+        connect_timeout, read_timeout = self.transport.timeout
+        timeout = aiohttp.ClientTimeout(sock_connect=connect_timeout, sock_read=read_timeout)
+        
+        self.logger.info(f"異步引擎開始抓取最多 {max_pages} 頁新聞（併發上限: {concurrency}）...")
+        if self.article_cache:
+            self.article_cache.reset_stats()
+        
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout,
+                                         headers=dict(self.transport.session.headers),
+                                         trace_configs=[self.transport.trace_config()]) as session:
+            
+            # 流式讀取文章頁，返回 ArticleStreamReader
+            async def read_stream(response) -> ArticleStreamReader:
+                reader = ArticleStreamReader(max_bytes)
+                chunks = response.content.iter_chunked(16384)
+                async for chunk in chunks:
+                    if reader.feed(chunk):
+                        break
+                size = len(reader.buffer)
+                if reader.end is not None:
+                    async for chunk in chunks:
+                        size += len(chunk)
+                        if size - len(reader.buffer) >= reader.DRAIN_LIMIT:
+                            break
+                self._record_stream(reader, size)
+                return reader
+            
+            async def request(url: str, kind: str, headers: Optional[Dict[str, str]] = None):
+                async with semaphore:
+                    await rate_limiter.wait(urlparse(url).netloc)
+                    # 只計請求本身的耗時，不含排隊及限速等待
+                    start = time.perf_counter()
+                    try:
+                        async with session.get(url, headers=headers) as response:
+                            if kind == 'article' and stream_articles and response.status < 300:
+                                self._record_response(kind, response.status)
+                                return response.status, await read_stream(response), response.headers
+                            body = await response.read() if response.status != 304 else b''
+                            self._record_response(kind, response.status, len(body))
+                            if response.status == 304:
+                                return response.status, '', response.headers
+                            response.raise_for_status()
+                            return response.status, body.decode('utf-8', errors='replace'), response.headers
+                    except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+                        self._record_response(kind, 'error')
+                        raise
+                    finally:
+                        stage = 'fetch_page' if kind == 'listing' else 'fetch_article_content'
+                        self.metrics.observe('gcs_monitor_stage_duration_seconds', time.perf_counter() - start, stage=stage)
+            
+            # 429/5xx/超時按指數退避加隨機抖動重試；Retry-After 期間暫停對該主機的所有請求
+            async def get(url: str, kind: str, headers: Optional[Dict[str, str]] = None):
+                for attempt in range(max_retries + 1):
+                    try:
+                        return await request(url, kind, headers)
+                    except Exception as e:
+                        if attempt == max_retries or not self._is_transient_error(e):
+                            raise
+                        retry_after = None
+                        if isinstance(e, aiohttp.ClientResponseError) and e.headers:
+                            retry_after = _parse_retry_after(e.headers.get('Retry-After'))
+                        if retry_after:
+                            rate_limiter.pause(urlparse(url).netloc, retry_after)
+                        delay = self._retry_delay(attempt, retry_after)
+                        self.metrics.inc('gcs_monitor_http_retries_total', kind=kind)
+                        self.logger.debug(f"請求失敗，{delay:.1f} 秒後重試 ({attempt + 1}/{max_retries}): {e}")
+                        await asyncio.sleep(delay)
             
-            has_keyword = any(kw.lower() in text_to_search.lower() for kw in keywords)
+            async def fetch_content(url: str, title: str) -> Optional[str]:
+                cache = self.article_cache
+                content, entry = self._lookup_cache(url, title)
+                if content is not None:
+                    return content
+                try:
+                    status, body, headers = await get(url, 'article', self._conditional_headers(entry))
+                    if status == 304 and entry:
+                        cache.record('revalidated')
+                        cache.touch(url, fetched=True)
+                        return entry['content']
+                    content_text = await self._extract_content_async(body)
+                    if cache:
+                        cache.record('misses')
+                        cache.put(url, content_text, headers.get('ETag'), headers.get('Last-Modified'), title)
+                    return content_text
+                except Exception as e:
+                    if self._is_transient_error(e):
+                        self.logger.warning(f"抓取內文失敗（已重試 {max_retries} 次）{url}: {e}",
+                                            extra={'url': url, 'stage': 'fetch_article_content'})
+                        return None
+                    self.logger.debug(f"抓取內文失敗 {url}: {e}", extra={'url': url, 'stage': 'fetch_article_content'})
+                    return ""
+            
+            async def process(news: NewsItem):
+                start = time.perf_counter()
+                content = await fetch_content(news.url, news.title)
+                self._set_content(news, content)
+                self.metrics.inc('gcs_monitor_stage_items_total', stage='fetch_article_content')
+                self._log_article(news.url, 'fetch_article_content', time.perf_counter() - start, self._content_result(content))
+                if on_item:
+                    on_item(news)
+            
+            recent_news = []
+            content_tasks = []
+            seen = set()
+            
+            async def crawl_source(source: Dict):
+                news_url = source['news_url']
+                label = self._source_label(source)
+                total_count = 0
+                unique_count = 0
+                recent_count = 0
+                
+                for page in range(max_pages):
+                    try:
+                        if page == 0 and news_url in self._prefetched_pages:
+                            news_list = self._prefetched_pages.pop(news_url)
+                        else:
+                            _, text, _ = await get(self._page_url(news_url, page), 'listing')
+                            news_list = self._parse_listing(text, news_url)
+                    except Exception as e:
+                        self.logger.error(f"{label}抓取第 {page + 1} 頁失敗: {e}")
+                        news_list = []
+                    self.metrics.inc('gcs_monitor_stage_items_total', len(news_list), stage='fetch_page')
+                    
+                    if not news_list:
+                        self.logger.info(f"{label}第 {page + 1} 頁無新聞，停止抓取")
+                        break
+                    
+                    seen_before = len(seen)
+                    page_news, old_news_count = self._screen_page(news_list, seen, cutoff_time, source)
+                    total_count += len(news_list)
+                    unique_count += len(seen) - seen_before
+                    recent_count += len(page_news)
+                    recent_news.extend(page_news)
+                    self.logger.info(f"{label}第 {page + 1} 頁: {len(news_list)} 條新聞 ({old_news_count} 條超過 {days_to_check} 天)")
+                    
+                    # 列表頁解析後立即調度內文抓取，無需等待後續分頁
+                    for news in page_news:
+                        if check_content and (not plan or self._plan_news(news, profiles)):
+                            content_tasks.append(asyncio.create_task(process(news)))
+                        elif on_item:
+                            on_item(news)
+                    
+                    if old_news_count >= len(news_list) * 0.8:
+                        self.logger.info(f"{label}第 {page + 1} 頁大部分新聞已超過 {days_to_check} 天，停止抓取")
+                        break
+                    
+                    if self._reached_checkpoint(news_url, news_list):
+                        self.logger.info(f"{label}第 {page + 1} 頁已到達上次抓取的位置，停止抓取（增量模式）")
+                        break
+                
+                self.logger.info(f"{label}共抓取 {total_count} 條新聞，去重後 {unique_count} 條，{days_to_check} 天內新聞 {recent_count} 條")
             
-            if has_keyword and news['url'] not in self.sent_news:
-                filtered.append(news)
-                self.logger.info(f"發現相關新聞: {news['title']}")
-            elif has_keyword and news['url'] in self.sent_news:
-                self.logger.debug(f"新聞已發送過，跳過: {news['title']}")
+            # 各來源的翻頁並行進行，共用同一事件循環、連接池和限速器
+            await asyncio.gather(*(crawl_source(source) for source in self._get_sources()))
+            
+            if content_tasks:
+                await asyncio.gather(*content_tasks)
+                self.logger.info(f"內文抓取完成: {len(content_tasks)} 條")
+                self._log_cache_stats()
         
-        return filtered
+        return recent_news
     
-    """構建 HTML 格式的郵件內容"""
-    def _build_email_html(self, news_list: List[Dict[str, str]]) -> str:
-        now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    """流式產出新聞：每條新聞在列表頁解析並抓取內文後立即產出，不等待整輪抓取結束"""
+    def iter_news(self) -> Iterator[NewsItem]:
+        check_content = self.config.get('check_content', True)
         
-        html = f"""<!DOCTYPE html>
-<html>
-<head>
-<meta charset="utf-8">
-<style>
-  body {{ font-family: 'Microsoft YaHei', 'Segoe UI', Arial, sans-serif; background: #f4f6f9; margin: 0; padding: 20px; }}
-  .container {{ max-width: 700px; margin: 0 auto; background: #ffffff; border-radius: 10px; box-shadow: 0 2px 12px rgba(0,0,0,0.08); overflow: hidden; }}
-  .header {{ background: linear-gradient(135deg, #1a73e8, #0d47a1); padding: 24px 30px; color: #ffffff; }}
-  .header h1 {{ margin: 0; font-size: 22px; font-weight: 600; }}
-  .header p {{ margin: 8px 0 0; font-size: 13px; opacity: 0.85; }}
-  .content {{ padding: 24px 30px; }}
-  .summary {{ background: #e8f0fe; border-left: 4px solid #1a73e8; padding: 12px 16px; margin-bottom: 20px; border-radius: 0 6px 6px 0; font-size: 14px; color: #1a56b8; }}
-  .news-item {{ border: 1px solid #e8eaed; border-radius: 8px; padding: 16px 20px; margin-bottom: 14px; transition: box-shadow 0.2s; }}
-  .news-item:hover {{ box-shadow: 0 2px 8px rgba(0,0,0,0.1); }}
-  .news-title {{ font-size: 16px; font-weight: 600; color: #202124; margin: 0 0 8px; }}
-  .news-title a {{ color: #1a73e8; text-decoration: none; }}
-  .news-title a:hover {{ text-decoration: underline; }}
-  .news-preview {{ font-size: 13px; color: #5f6368; line-height: 1.6; margin: 0; }}
-  .news-time {{ font-size: 12px; color: #9aa0a6; margin-top: 8px; }}
-  .footer {{ padding: 16px 30px; background: #f8f9fa; border-top: 1px solid #e8eaed; text-align: center; font-size: 12px; color: #9aa0a6; }}
-  .badge {{ display: inline-block; background: #e8f0fe; color: #1a73e8; padding: 2px 8px; border-radius: 4px; font-size: 12px; font-weight: 500; margin-left: 8px; }}
-</style>
-</head>
-<body>
-<div class="container">
-  <div class="header">
-    <h1>澳門新聞局 — 軍團菌相關新聞</h1>
-    <p>監控時間: {now}</p>
-  </div>
-  <div class="content">
-    <div class="summary">
-      共發現 <strong>{len(news_list)}</strong> 條相關新聞
-    </div>
-"""
+        if self.engine != 'async' and not check_content:
+            seen = set()
+            for source in self._get_sources():
+                for page_news in self.iter_pages(source, seen):
+                    yield from page_news
+            return
         
-        for i, news in enumerate(news_list, 1):
-            content_preview = ""
-            if news.get('content'):
-                content_preview = news['content'][:300]
-                if len(news['content']) > 300:
-                    content_preview += "..."
-            
-            publish_time_str = ""
-            if news.get('publish_time'):
-                publish_time_str = news['publish_time'].strftime('%Y-%m-%d %H:%M')
-            
-            html += f"""
-    <div class="news-item">
-      <p class="news-title">
-        {i}. <a href="{news['url']}" target="_blank">{news['title']}</a>
-        <span class="badge">軍團菌</span>
-      </p>
-      {"<p class='news-preview'>" + content_preview + "</p>" if content_preview else ""}
-      {"<p class='news-time'>" + publish_time_str + "</p>" if publish_time_str else ""}
-    </div>
-"""
+        results = queue.Queue()
+        done = object()
         
-        html += """
-  </div>
-  <div class="footer">
-     數據來源: <a href="https://www.gcs.gov.mo" style="color:#1a73e8;">澳門新聞局</a>
-  </div>
-</div>
-</body>
-</html>
-"""
-        return html
+        def produce():
+            try:
+                if self.engine == 'async':
+                    self.crawl_async(on_item=results.put, plan=self.config.get('skip_known_articles', True))
+                else:
+                    self._produce_contents(results.put)
+            except Exception as e:
+                self.logger.error(f"抓取流程異常終止: {e}")
+            finally:
+                results.put(done)
+        
+        threading.Thread(target=produce, name='news-producer', daemon=True).start()
+        
+        while True:
+            news = results.get()
+            if news is done:
+                break
+            yield news
     
-    """通過 Email 發送新聞通知"""
-    def send_email(self, news_list: List[Dict[str, str]]) -> bool:
-        if not news_list:
-            self.logger.info("沒有需要發送的新聞")
-            return True
+    """線程引擎的流水線生產者：每頁解析後立即把新聞提交給內文抓取線程池"""
+    def _produce_contents(self, on_item: Callable[[NewsItem], None]):
+        max_workers = self.throttle.max_limit
+        self.logger.info(f"內文抓取線程池已啓動（併發數: {int(self.throttle.limit)}，上限: {max_workers}），列表頁解析後立即抓取內文")
+        
+        if self.article_cache:
+            self.article_cache.reset_stats()
+        
+        completed = 0
+        lock = threading.Lock()
+        
+        def fetch(news: NewsItem):
+            nonlocal completed
+            try:
+                self._set_content(news, self.fetch_article_content(news.url, news.title))
+            except Exception as e:
+                self.logger.warning(f"獲取內文失敗: {e}")
+                news.content = ""
+            on_item(news)
+            with lock:
+                completed += 1
+                if completed % 10 == 0:
+                    self.logger.info(f"已完成 {completed} 條")
+        
+        plan = self.config.get('skip_known_articles', True)
+        profiles = self._get_profiles()
+        seen = set()
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            for source in self._get_sources():
+                for page_news in self.iter_pages(source, seen):
+                    for news in page_news:
+                        if not plan or self._plan_news(news, profiles):
+                            executor.submit(fetch, news)
+                        else:
+                            on_item(news)
+        
+        self.logger.info(f"內文抓取完成: {completed} 條（併發上限調整爲 {self.throttle.limit:.1f}）")
+        self._log_cache_stats()
+    
+    """內文抓取規劃：列表頁解析後、抓取內文前決定每條新聞是否需要內文，返回 True 時交給內文抓取；
+    決定計入 gcs_monitor_plan_total 並逐條寫入本輪運行摘要
+    
+    - sent：所有相關訂閱均已發送（或在發件箱、摘要中）且緩存未過期，不發請求，沿用緩存內文以檢測內容更新
+    - revalidate：已發送但緩存已過期，交給內文抓取發條件請求，內容有修改時纔會重新下載
+    - title_match：標題已命中，其餘相關訂閱均已發送，無需內文即可判定
+    - title_changed：已發送但列表頁標題與緩存（或本地文章庫）中的不同，重新抓取以檢測內容更新
+    - unsubscribed：沒有訂閱接收該來源的新聞
+    - fetch：仍需內文才能判定"""
+    def _plan_news(self, news: NewsItem, profiles: List[Dict]) -> bool:
+        decision, entry = self._plan_decision(news, profiles)
+        self.metrics.inc('gcs_monitor_plan_total', decision=decision)
+        self._plan_log.append({'url': news.url, 'title': news.title, 'decision': decision})
+        if decision == 'sent' and entry:
+            news.content = entry['content']
+        return decision in ('fetch', 'title_changed', 'revalidate')
+    
+    """規劃決定及該新聞的緩存條目"""
+    def _plan_decision(self, news: NewsItem, profiles: List[Dict]) -> Tuple[str, Optional[Dict]]:
+        matcher = self.matcher or self.build_matcher()
+        title_profiles = {name for kw in matcher.search(news.title) for name in self._keyword_profiles.get(kw, [])}
+        eligible = False
+        title_match = False
+        for profile in profiles:
+            if profile.get('sources') and news.source not in profile['sources']:
+                continue
+            eligible = True
+            if self._delivered_or_pending(profile, news.url):
+                continue
+            if profile['name'] not in title_profiles:
+                return 'fetch', None
+            title_match = True
+        
+        if not eligible:
+            return 'unsubscribed', None
+        if title_match:
+            return 'title_match', None
+        # 標題是否變更：優先對比緩存，未緩存內文的（如 title_match 跳過抓取的）對比本地文章庫
+        entry = self.article_cache.get(news.url) if self.article_cache else None
+        previous_title = entry['title'] if entry else None
+        if previous_title is None and self.article_store is not None:
+            previous_title = self.article_store.title(news.url)
+        if previous_title and previous_title != news.title:
+            return 'title_changed', None
+        if entry and not self.article_cache.is_fresh(entry):
+            return 'revalidate', None
+        return 'sent', entry
+    
+    """用所有訂閱的關鍵詞構建一個匹配自動機（關鍵詞未變時沿用已構建的自動機）"""
+    def build_matcher(self) -> KeywordMatcher:
+        profiles = self._get_profiles()
+        signature = [(profile['name'], list(profile.get('keywords', []))) for profile in profiles]
+        if self.matcher is not None and self._matcher_keywords == signature:
+            return self.matcher
+        
+        self._keyword_profiles = {}
+        for profile in profiles:
+            for kw in profile.get('keywords', []):
+                self._keyword_profiles.setdefault(kw, []).append(profile['name'])
+        
+        self.matcher = KeywordMatcher(list(self._keyword_profiles))
+        self._matcher_keywords = signature
+        self.logger.debug(f"關鍵詞匹配器已構建: {len(profiles)} 個訂閱，{len(self.matcher.keywords)} 個關鍵詞")
+        return self.matcher
+    
+    """掃描一次新聞文本，返回命中且尚未向其發送過的訂閱；命中的關鍵詞及位置記錄在 matched_keywords"""
+    def match_profiles(self, news: NewsItem) -> List[Dict]:
+        with self.metrics.time('match_news'):
+            matched = self._match_profiles(news)
+        if matched:
+            self.metrics.inc('gcs_monitor_stage_items_total', stage='match_news')
+        return matched
+    
+    def _match_profiles(self, news: NewsItem) -> List[Dict]:
+        matcher = self.matcher or self.build_matcher()
+        
+        text_to_search = news.title
+        if news.content:
+            text_to_search += ' ' + news.content
+        
+        news.matched_keywords = matcher.search(text_to_search)
+        if not news.matched_keywords:
+            return []
+        
+        hit_profiles = {name for kw in news.matched_keywords for name in self._keyword_profiles.get(kw, [])}
+        matched = []
+        for profile in self._get_profiles():
+            if profile['name'] not in hit_profiles:
+                continue
+            if profile.get('sources') and news.source not in profile['sources']:
+                continue
+            keys = self._delivery_keys(profile, news.url)
+            if any(key in self._pending_keys for key in keys) or (
+                    all(key in self.sent_news for key in keys) and not self._has_new_keywords(profile, keys[0], news)):
+                self.logger.debug(f"新聞已發送過或在發件箱中等待發送，跳過: {news.title} ({profile['name']})",
+                                  extra={'url': news.url, 'stage': 'match_news', 'profile': profile['name']})
+                continue
+            matched.append(profile)
+        
+        if matched:
+            self.logger.info(f"發現相關新聞: {news.title} (關鍵詞: {', '.join(news.matched_keywords)})",
+                             extra={'url': news.url, 'stage': 'match_news'})
+        return matched
+    
+    """新聞命中的該訂閱關鍵詞"""
+    def _profile_keywords(self, profile: Dict, news: NewsItem) -> List[str]:
+        return [kw for kw in profile.get('keywords', []) if kw in (news.matched_keywords or {})]
+    
+    """已發送過的新聞：內容指紋有變化且出現了上次未通知的關鍵詞時返回 True（需再次發送）；
+    指紋變化但沒有新關鍵詞時只更新指紋，舊記錄沒有指紋時以當前內容爲基準"""
+    def _has_new_keywords(self, profile: Dict, sent_key: str, news: NewsItem) -> bool:
+        # 內文未抓取（規劃階段跳過）或抓取失敗時無法判斷
+        if not isinstance(self.sent_news, SentNewsStore) or news.content_failed or news.content is None:
+            return False
+        fingerprint = self.sent_news.fingerprint(sent_key)
+        if fingerprint is None:
+            return False
+        
+        stored_hash, notified = fingerprint
+        current_hash = content_fingerprint(news.title, news.content)
+        if stored_hash == current_hash:
+            return False
         
+        keywords = self._profile_keywords(profile, news)
+        new_keywords = [kw for kw in keywords if kw not in notified] if stored_hash else []
+        if not new_keywords:
+            self.sent_news.set_fingerprint(sent_key, current_hash, notified if stored_hash else keywords)
+            return False
+        
+        if news.updated_for is None:
+            news.updated_for = {}
+        news.updated_for[profile['name']] = new_keywords
+        self.logger.info(f"已發送的新聞內容有更新，出現新關鍵詞 {', '.join(new_keywords)}，將再次發送: {news.title} ({profile['name']})",
+                         extra={'url': news.url, 'stage': 'match_news', 'profile': profile['name']})
+        return True
+    
+    """本次發送後要記錄的指紋：{已發送記錄鍵: {'hash': 內容指紋, 'keywords': 累計已通知的關鍵詞}}"""
+    def _sent_fingerprints(self, news_list: List[NewsItem], profile: Dict, channel: str = 'email') -> Dict[str, Dict]:
+        if not isinstance(self.sent_news, SentNewsStore):
+            return {}
+        fingerprints = {}
+        for news in news_list:
+            if news.content_failed or news.content is None:
+                continue
+            sent_key = self._channel_key(channel, self._sent_key(profile, news.url))
+            notified = set(self._profile_keywords(profile, news))
+            previous = self.sent_news.fingerprint(sent_key)
+            if previous:
+                notified.update(previous[1])
+            fingerprints[sent_key] = {
+                'hash': content_fingerprint(news.title, news.content),
+                'keywords': sorted(notified)
+            }
+        return fingerprints
+    
+    """判斷單條新聞是否包含關鍵詞且尚未發送"""
+    def match_news(self, news: NewsItem) -> bool:
+        return bool(self.match_profiles(news))
+    
+    """過濾包含關鍵詞的新聞（標題或內文）"""
+    def filter_news(self, news_list: List[NewsItem]) -> List[NewsItem]:
+        with self.metrics.time('filter_news'):
+            filtered = [news for news in news_list if self.match_news(news)]
+        self.metrics.inc('gcs_monitor_stage_items_total', len(filtered), stage='filter_news')
+        return filtered
+    
+    """訂閱使用的郵件渲染器（email_template / email_item_template 可按訂閱覆蓋），按模板文件緩存"""
+    def _get_renderer(self, profile: Optional[Dict] = None) -> EmailRenderer:
+        profile = profile or {}
+        files = tuple(profile.get(key) or self.config.get(key) for key in ('email_template', 'email_item_template'))
+        renderer = self._renderers.get(files)
+        if renderer is None:
+            try:
+                renderer = EmailRenderer.from_files(*files)
+            except OSError as e:
+                self.logger.error(f"讀取郵件模板失敗，改用內置模板: {e}")
+                renderer = EmailRenderer()
+            self._renderers[files] = renderer
+        return renderer
+    
+    """構建 HTML 格式的郵件內容"""
+    def _build_email_html(self, news_list: List[NewsItem], keywords: Optional[List[str]] = None,
+                          profile_name: Optional[str] = None, renderer: Optional[EmailRenderer] = None,
+                          since: Optional[datetime] = None, title: Optional[str] = None) -> str:
+        renderer = renderer or self._get_renderer()
+        return renderer.render_html(news_list, keywords, profile_name, since, title or self._email_title(self._get_profiles()[0]))
+    
+    """構建郵件並放入發件箱，返回發件箱條目；SMTP 未配置時返回 None。since 爲摘要開始累積的時間"""
+    def queue_email(self, news_list: List[NewsItem], profile: Optional[Dict] = None,
+                    since: Optional[datetime] = None) -> Optional[Dict]:
         # 讀取 SMTP 配置
-        smtp_server = self.config.get('smtp_server', 'smtp-mail.outlook.com')
-        smtp_port = self.config.get('smtp_port', 587)
-        smtp_use_ssl = self.config.get('smtp_use_ssl', False)
         smtp_username = self.config.get('smtp_username', '')
         smtp_password = self.config.get('smtp_password', '')
         email_from = self.config.get('email_from', smtp_username)
-        email_to = self.config.get('email_to', [])
-        subject_prefix = self.config.get('email_subject_prefix', '【澳門新聞監控】')
+        profile = profile or self._get_profiles()[0]
+        email_to = profile.get('email_to') or self.config.get('email_to', [])
+        subject_prefix = profile.get('email_subject_prefix') or self.config.get('email_subject_prefix', '【澳門新聞監控】')
         
         if not smtp_username or not smtp_password:
             self.logger.error("SMTP 用戶名或密碼未配置，請在 config_email.json 中設置")
-            return False
+            return None
         
         if not email_to:
             self.logger.error("收件人未配置，請在 config_email.json 中設置 email_to")
-            return False
+            return None
         
         # 確保 email_to 是列表
         if isinstance(email_to, str):
             email_to = [email_to]
         
         # 構建郵件
-        subject = f"{subject_prefix} 發現 {len(news_list)} 條軍團菌相關新聞"
-        html_content = self._build_email_html(news_list)
+        title = self._email_title(profile)
+        subject = f"{subject_prefix} 發現 {len(news_list)} 條{title}"
+        renderer = self._get_renderer(profile)
+        html_content = self._build_email_html(news_list, profile.get('keywords'), profile['name'], renderer, since, title)
         
         msg = MIMEMultipart('alternative')
         msg['From'] = email_from
@@ -403,110 +3031,743 @@ class MacauNewsMonitorEmail:
         msg['Subject'] = Header(subject, 'utf-8')
         
         # 純文本備用內容
-        text_content = f"澳門新聞局新聞監控\n\n共發現 {len(news_list)} 條相關新聞:\n\n"
-        for i, news in enumerate(news_list, 1):
-            text_content += f"{i}. {news['title']}\n   鏈接: {news['url']}\n\n"
-        
-        msg.attach(MIMEText(text_content, 'plain', 'utf-8'))
+        msg.attach(MIMEText(renderer.render_text(news_list, since), 'plain', 'utf-8'))
         msg.attach(MIMEText(html_content, 'html', 'utf-8'))
         
-        # 發送郵件
+        sent_keys = [self._sent_key(profile, news.url) for news in news_list]
+        try:
+            entry = self.outbox.add(email_from, email_to, msg.as_string(), sent_keys, profile['name'],
+                                    self._sent_fingerprints(news_list, profile))
+        except Exception as e:
+            self.logger.error(f"寫入郵件發件箱失敗: {e}")
+            return None
+        self._pending_keys.update(sent_keys)
+        return entry
+    
+    """把一個訂閱的匹配批次寫入發件箱，每個渠道一個條目；已在某渠道發送過或正在該渠道發件箱中的新聞不再發給該渠道
+    （內容更新需再次發送的除外）。since 爲摘要開始累積的時間；返回是否全部寫入"""
+    def queue_notification(self, news_list: List[NewsItem], profile: Dict, since: Optional[datetime] = None) -> bool:
+        outbox_keys = self.outbox.pending_keys()
+        queued = True
+        for channel in self._profile_channels(profile):
+            items = []
+            for news in news_list:
+                key = self._channel_key(channel, self._sent_key(profile, news.url))
+                if key in outbox_keys:
+                    continue
+                if key not in self.sent_news or profile['name'] in (news.updated_for or {}):
+                    items.append(news)
+            if not items:
+                continue
+            if channel == 'email':
+                entry = self.queue_email(items, profile, since)
+            else:
+                entry = self._queue_payload(channel, items, profile, since)
+            queued = entry is not None and queued
+        return queued
+    
+    """webhook / file 渠道：把通知內容寫入發件箱，返回發件箱條目；webhook 地址未配置時返回 None"""
+    def _queue_payload(self, channel: str, news_list: List[NewsItem], profile: Dict,
+                       since: Optional[datetime] = None) -> Optional[Dict]:
+        if channel == 'webhook':
+            target = profile.get('webhook_url') or self.config.get('webhook_url', '')
+            if not target:
+                self.logger.error("Webhook 地址未配置，請在 config_email.json 中設置 webhook_url")
+                return None
+        else:
+            target = profile.get('notify_file') or self.config.get('notify_file', 'notifications.jsonl')
+        
+        sent_keys = [self._channel_key(channel, self._sent_key(profile, news.url)) for news in news_list]
+        try:
+            entry = self.outbox.add_notification(channel, target, self._notification_payload(news_list, profile, since),
+                                                 sent_keys, profile['name'], self._sent_fingerprints(news_list, profile, channel))
+        except Exception as e:
+            self.logger.error(f"寫入通知發件箱失敗 [{channel}]: {e}")
+            return None
+        self._pending_keys.update(sent_keys)
+        return entry
+    
+    """webhook / file 渠道的通知內容（JSON 對象）"""
+    def _notification_payload(self, news_list: List[NewsItem], profile: Dict, since: Optional[datetime] = None) -> Dict:
+        return {
+            'profile': profile['name'],
+            'generated_at': datetime.now().isoformat(),
+            'since': since.isoformat() if since else None,
+            'count': len(news_list),
+            'news': [{
+                'title': news.title,
+                'url': news.url,
+                'source': news.source,
+                'publish_time': news.publish_time.isoformat() if news.publish_time else None,
+                'keywords': self._profile_keywords(profile, news),
+                'updated_keywords': (news.updated_for or {}).get(profile['name']),
+                'preview': (news.content or '')[:EmailRenderer.PREVIEW_LENGTH]
+            } for news in news_list]
+        }
+    
+    """即時推送：把新聞寫入發件箱並在後台投遞到訂閱的各渠道，不等待投遞完成；返回是否已寫入發件箱"""
+    def notify(self, news_list: List[NewsItem], profile: Dict) -> bool:
+        queued = self.queue_notification(news_list, profile)
+        self.flush_outbox(wait=False)
+        return queued
+    
+    """按渠道併發投遞發件箱：每個渠道在自己的線程中按順序投遞本渠道的條目，慢的渠道不阻塞其他渠道，
+    投遞確認後按渠道標記爲已發送。wait 爲 False 時只在後台啓動投遞並立即返回 True（常駐模式下投遞跨輪次繼續）；
+    wait 時等待所有投遞結束（每個條目每輪只嘗試一次），返回是否全部發出"""
+    def flush_outbox(self, wait: bool = True) -> bool:
+        if not wait:
+            self._dispatch_notifications()
+            return True
+        
+        self._expire_outbox()
+        
+        # 等待中途可能有新條目寫入，直到沒有未嘗試的條目
+        while True:
+            self._dispatch_notifications()
+            running = [future for future in self._notify_futures.values() if not future.done()]
+            if not running:
+                break
+            for future in running:
+                future.result()
+        self._notify_attempted = set()
+        
+        try:
+            self.outbox.save()
+        except Exception as e:
+            self.logger.error(f"保存郵件發件箱失敗: {e}")
+        self._pending_keys = self.outbox.pending_keys() | self.digest.pending_keys()
+        return not self.outbox.entries
+    
+    """每輪開始時清理過期條目，並讓上一輪投遞失敗的條目本輪再嘗試一次（上一輪的後台投遞可能仍在進行）"""
+    def _begin_notify_round(self):
+        self._expire_outbox()
+        self._notify_attempted = set()
+    
+    """放棄超過 email_outbox_max_age_days 天仍未發出的條目"""
+    def _expire_outbox(self):
+        max_age_days = self.config.get('email_outbox_max_age_days', 7)
+        for entry in self.outbox.expire(max_age_days):
+            self.logger.error(f"通知超過 {max_age_days} 天仍未發出，已放棄 [{entry.get('channel', 'email')}]: "
+                              f"{self._entry_target(entry)}，最後錯誤: {entry['last_error']}")
+    
+    """進程退出前等待後台投遞結束並關閉 SMTP 連接；返回發件箱是否已清空"""
+    def finish_notifications(self) -> bool:
+        delivered = self.flush_outbox() if self.outbox.entries or self._notify_futures else True
+        if not delivered:
+            self.logger.warning(f"發件箱中仍有 {len(self.outbox.entries)} 條通知未發出，將在下次運行時重試")
+        self._stop_notify_pool()
+        self.delivery.close()
+        return delivered
+    
+    """等待後台投遞任務結束並釋放通知線程池（重新加載配置時渠道可能變化，下次投遞時按新渠道數重建）"""
+    def _stop_notify_pool(self):
+        if self._notify_pool is not None:
+            self._notify_pool.shutdown(wait=True)
+            self._notify_pool = None
+        self._notify_futures = {}
+    
+    """爲有未嘗試條目的渠道啓動後台投遞（同一渠道同時只有一個投遞任務，保證條目按順序投遞）"""
+    def _dispatch_notifications(self):
+        if self._notify_pool is None:
+            self._notify_pool = ThreadPoolExecutor(max_workers=len(self.channels), thread_name_prefix='notify')
+        for name in self.channels:
+            future = self._notify_futures.get(name)
+            if future is not None and not future.done():
+                continue
+            if any(entry['id'] not in self._notify_attempted for entry in self.outbox.entries_for(name)):
+                self._notify_futures[name] = self._notify_pool.submit(self._deliver_channel, name)
+    
+    """投遞一個渠道的條目（在通知線程中運行），直到該渠道沒有未嘗試的條目或遇到不可重試的錯誤"""
+    def _deliver_channel(self, name: str):
+        channel = self.channels[name]
+        try:
+            while True:
+                entries = [entry for entry in self.outbox.entries_for(name) if entry['id'] not in self._notify_attempted]
+                if not entries:
+                    return
+                for entry in entries:
+                    self._notify_attempted.add(entry['id'])
+                    if not self._deliver_entry(channel, entry):
+                        return
+        except Exception as e:
+            self.logger.error(f"通知投遞異常終止 [{name}]: {e}")
+    
+    """投遞一個條目，投遞確認後按渠道標記爲已發送並移出發件箱；返回 False 時本輪不再嘗試該渠道（如 SMTP 認證失敗）"""
+    def _deliver_entry(self, channel, entry: Dict) -> bool:
         try:
-            if smtp_use_ssl:
-                # SSL 連接（端口 465）
-                context = ssl.create_default_context()
-                with smtplib.SMTP_SSL(smtp_server, smtp_port, context=context, timeout=30) as server:
-                    server.login(smtp_username, smtp_password)
-                    server.sendmail(email_from, email_to, msg.as_string())
+            with self.metrics.time(channel.stage):
+                channel.send(entry)
+        except Exception as e:
+            self._record_notification(channel.name, 'failed')
+            entry['attempts'] += 1
+            entry['last_error'] = str(e)
+            if isinstance(e, smtplib.SMTPAuthenticationError):
+                self.logger.error(f"SMTP 認證失敗，請檢查用戶名和密碼: {e}")
+                self.logger.error("提示: Outlook 可能需要使用應用專用密碼")
+            else:
+                self.logger.error(f"通知投遞失敗 [{channel.name}]，保留在發件箱中下次重試: {e}")
+            return not isinstance(e, channel.fatal_errors)
+        
+        latency = time.time() - entry['created_at']
+        self.metrics.observe('gcs_monitor_alert_latency_seconds', latency, channel=channel.name)
+        self._record_notification(channel.name, 'sent')
+        self.metrics.inc('gcs_monitor_stage_items_total', len(entry['sent_keys']), stage=channel.stage)
+        self.logger.info(f"通知已投遞 [{channel.name}]: {self._entry_target(entry)}（寫入發件箱後 {latency:.1f} 秒送達）")
+        
+        # 投遞確認後標記爲已發送（批量寫入）
+        with self._sent_lock:
+            if isinstance(self.sent_news, SentNewsStore):
+                self.sent_news.update(entry['sent_keys'], fingerprints=entry.get('fingerprints'))
             else:
-                # TLS 連接（端口 587）
-                with smtplib.SMTP(smtp_server, smtp_port, timeout=30) as server:
-                    server.ehlo()
-                    server.starttls()
-                    server.ehlo()
-                    server.login(smtp_username, smtp_password)
-                    server.sendmail(email_from, email_to, msg.as_string())
+                self.sent_news.update(entry['sent_keys'])
+            self._save_sent_news()
+        self.outbox.remove(entry['id'])
+        try:
+            self.outbox.save()
+        except Exception as e:
+            self.logger.error(f"保存郵件發件箱失敗: {e}")
+        return True
+    
+    """記錄渠道投遞結果（郵件渠道同時計入 gcs_monitor_emails_total）"""
+    def _record_notification(self, channel: str, result: str):
+        self.metrics.inc('gcs_monitor_notifications_total', channel=channel, result=result)
+        if channel == 'email':
+            self.metrics.inc('gcs_monitor_emails_total', result=result)
+    
+    """條目的投遞目標（收件人、webhook 地址或文件路徑），用於日誌"""
+    @staticmethod
+    def _entry_target(entry: Dict) -> str:
+        if 'email_to' in entry:
+            return ', '.join(entry['email_to'])
+        return entry.get('target', '')
+    
+    """訂閱的摘要間隔（秒），0 爲逐輪發送"""
+    def _digest_interval(self, profile: Dict) -> float:
+        return profile.get('digest_interval', self.config.get('digest_interval', 0))
+    
+    """把一個訂閱本輪的匹配結果加入摘要（摘要模式）或寫入發件箱；返回是否已持久化"""
+    def _queue_matches(self, news_list: List[NewsItem], profile: Dict) -> bool:
+        if not self._digest_interval(profile):
+            return self.queue_notification(news_list, profile)
+        
+        sent_keys = [self._delivery_keys(profile, news.url) for news in news_list]
+        try:
+            self.digest.add(profile['name'], news_list, sent_keys)
+        except Exception as e:
+            self.logger.error(f"寫入郵件摘要失敗: {e}")
+            return False
+        self._pending_keys.update(key for keys in sent_keys for key in keys)
+        self.logger.info(f"{len(news_list)} 條新聞已加入摘要 [{profile['name']}]，到期後合併發送")
+        return True
+    
+    """把已到期的摘要合併成一條通知寫入發件箱（關閉摘要模式後殘留的摘要立即發送）；返回是否全部寫入"""
+    def _queue_due_digests(self, profiles: List[Dict]) -> bool:
+        queued = True
+        for profile in profiles:
+            started_at = self.digest.started_at(profile['name'])
+            interval = self._digest_interval(profile)
+            if started_at is None or time.time() - started_at < interval:
+                continue
+            news_list = self.digest.items(profile['name'])
+            self.logger.info(f"摘要已到期 [{profile['name']}]，合併發送 {len(news_list)} 條新聞")
+            if not self.queue_notification(news_list, profile, since=datetime.fromtimestamp(started_at)):
+                queued = False
+                continue
+            self.digest.clear(profile['name'])
+        return queued
+    
+    """通過 Email 向一個訂閱發送新聞通知（未指定時爲默認訂閱）"""
+    def send_email(self, news_list: List[NewsItem], profile: Optional[Dict] = None) -> bool:
+        if not news_list:
+            self.logger.info("沒有需要發送的新聞")
+            return True
+        
+        entry = self.queue_email(news_list, profile)
+        if entry is None:
+            return False
+        self.flush_outbox()
+        return entry not in self.outbox.entries
+    
+    """打開本地文章庫"""
+    def _open_article_store(self) -> ArticleStore:
+        return ArticleStore(self.config.get('article_store_file', 'article_store.db'))
+    
+    """把本輪抓取過的新聞寫入本地文章庫"""
+    def _index_articles(self, news_list: List[NewsItem]):
+        if self.article_store is None or not news_list:
+            return
+        try:
+            self.article_store.add_articles(news_list)
+            self.logger.debug(f"已把 {len(news_list)} 條新聞寫入本地文章庫")
+        except sqlite3.Error as e:
+            self.logger.warning(f"寫入本地文章庫失敗: {e}")
+    
+    """在本地文章庫中查詢最近 days 天內提及任一檢索詞的文章（未指定檢索詞時使用所有訂閱的關鍵詞）；
+    返回的新聞帶有 matched_keywords，可直接用於構建郵件"""
+    def query_articles(self, terms: Optional[List[str]] = None, days: Optional[float] = None,
+                       limit: Optional[int] = None) -> List[NewsItem]:
+        store = self.article_store if self.article_store is not None else self._open_article_store()
+        terms = terms or [kw for profile in self._get_profiles() for kw in profile.get('keywords', [])]
+        since = datetime.now(timezone.utc) - timedelta(days=days) if days else None
+        
+        matcher = KeywordMatcher(terms)
+        results = []
+        for news in store.search(matcher.keywords, since, limit):
+            news.matched_keywords = matcher.search(f"{news.title} {news.content}")
+            results.append(news)
+        return results
+    
+    """新聞在訂閱的所有渠道均已發送，或有渠道正在等待發送"""
+    def _delivered_or_pending(self, profile: Dict, url: str) -> bool:
+        keys = self._delivery_keys(profile, url)
+        return any(key in self._pending_keys for key in keys) or all(key in self.sent_news for key in keys)
+    
+    """用本地文章庫補發：各訂閱在最近 days 天內命中、但尚未發送過的文章（新增關鍵詞後無需重新抓取），返回是否全部發出"""
+    def alert_from_index(self, days: float) -> bool:
+        self._pending_keys = self.outbox.pending_keys() | self.digest.pending_keys()
+        for profile in self._get_profiles():
+            news_list = [news for news in self.query_articles(profile.get('keywords', []), days)
+                         if (not profile.get('sources') or news.source in profile['sources'])
+                         and not self._delivered_or_pending(profile, news.url)]
+            self.logger.info(f"訂閱 {profile['name']}: 本地文章庫中 {days} 天內有 {len(news_list)} 篇未發送的相關文章")
+            if news_list:
+                self.queue_notification(news_list, profile)
+        
+        delivered = self.flush_outbox() if self.outbox.entries else True
+        self.delivery.close()
+        return delivered
+    
+    """規劃一個來源的回填分片：已有分片沿用其斷點，max_pages 超出已覆蓋範圍時把新增的頁碼切分爲新分片"""
+    def _plan_backfill_shards(self, store: ArticleStore, news_url: str, max_pages: int, shard_count: int) -> List[Dict]:
+        covered = max((shard['end_page'] for shard in store.shards(news_url)), default=0)
+        if covered < max_pages:
+            size = math.ceil((max_pages - covered) / shard_count)
+            store.create_shards(news_url, [(start, min(start + size, max_pages))
+                                           for start in range(covered, max_pages, size)])
+        return [shard for shard in store.shards(news_url) if not shard['done']]
+    
+    """歷史回填：把新聞列表的 nextPage 範圍切分爲多個分片並行抓取，逐頁把新聞及內文寫入本地文章庫；
+    每頁入庫時同時保存分片斷點，中斷後再次運行從斷點繼續。返回本次新增的文章數"""
+    def backfill(self, max_pages: Optional[int] = None, shard_count: Optional[int] = None, restart: bool = False) -> int:
+        max_pages = max_pages or self.config.get('backfill_max_pages', 3000)
+        shard_count = max(1, shard_count or self.config.get('backfill_shards', 4))
+        store = self._open_article_store()
+        self.build_matcher()
+        if self.article_cache:
+            self.article_cache.reset_stats()
+        
+        jobs = []
+        for source in self._get_sources():
+            if restart:
+                store.reset_shards(source['news_url'])
+            for shard in self._plan_backfill_shards(store, source['news_url'], max_pages, shard_count):
+                jobs.append((source, shard))
+        
+        self.logger.info(f"歷史回填開始: 最多 {max_pages} 頁，{len(jobs)} 個未完成分片，文章庫現有 {len(store)} 篇")
+        
+        ingested = matched = 0
+        with ThreadPoolExecutor(max_workers=self.throttle.max_limit) as content_pool:
+            # 上次內文抓取失敗的文章先補抓
+            if self.config.get('check_content', True):
+                missing = store.missing_content()
+                if missing:
+                    self.logger.info(f"補抓 {len(missing)} 篇上次內文抓取失敗的文章")
+                for news, content in zip(missing, content_pool.map(self.fetch_article_content, [n.url for n in missing])):
+                    if content is not None:
+                        store.set_content(news.url, content)
             
-            self.logger.info(f"郵件發送成功! 收件人: {', '.join(email_to)}")
+            if jobs:
+                with ThreadPoolExecutor(max_workers=len(jobs)) as shard_pool:
+                    futures = [shard_pool.submit(self._backfill_shard, store, source, shard, content_pool)
+                               for source, shard in jobs]
+                    for future in as_completed(futures):
+                        try:
+                            shard_ingested, shard_matched = future.result()
+                            ingested += shard_ingested
+                            matched += shard_matched
+                        except Exception as e:
+                            self.logger.error(f"回填分片異常終止: {e}")
+        self._log_cache_stats()
+        
+        unfinished = sum(1 for source in self._get_sources() for shard in store.shards(source['news_url']) if not shard['done'])
+        self.logger.info(f"歷史回填結束: 新增 {ingested} 篇（其中 {matched} 篇命中當前關鍵詞），文章庫共 {len(store)} 篇")
+        if unfinished:
+            self.logger.warning(f"仍有 {unfinished} 個分片未完成，再次運行 --backfill 將從斷點繼續")
+        return ingested
+    
+    """順序抓取一個分片的列表頁，每頁的新文章內文交給共用線程池抓取後整頁入庫；返回 (新增數, 命中數)"""
+    def _backfill_shard(self, store: ArticleStore, source: Dict, shard: Dict, content_pool: ThreadPoolExecutor) -> Tuple[int, int]:
+        news_url = source['news_url']
+        label = f"{self._source_label(source)}分片 {shard['start_page'] + 1}-{shard['end_page']}"
+        check_content = self.config.get('check_content', True)
+        ingested = matched = 0
+        
+        page = shard['next_page']
+        while page < shard['end_page']:
+            try:
+                response = self._request(self._page_url(news_url, page), 'listing')
+                response.raise_for_status()
+                response.encoding = 'utf-8'
+                news_list = self._parse_listing(response.text, news_url)
+            except Exception as e:
+                self.logger.error(f"{label} 在第 {page + 1} 頁中斷，下次從此頁繼續: {e}")
+                return ingested, matched
             
-            # 標記爲已發送
-            for news in news_list:
-                self.sent_news.add(news['url'])
-            self._save_sent_news()
+            if not news_list:
+                self.logger.info(f"{label} 第 {page + 1} 頁無新聞，已到達歸檔末尾")
+                break
             
-            return True
+            new_news = [news for news in news_list if news.url not in store]
+            for news in new_news:
+                news.source = source['name']
+            if check_content:
+                for news, content in zip(new_news, content_pool.map(self.fetch_article_content, [n.url for n in new_news])):
+                    news.content = content
             
-        except smtplib.SMTPAuthenticationError as e:
-            self.logger.error(f"SMTP 認證失敗，請檢查用戶名和密碼: {e}")
-            self.logger.error("提示: Outlook 可能需要使用應用專用密碼")
-            return False
-        except smtplib.SMTPException as e:
-            self.logger.error(f"SMTP 發送失敗: {e}")
-            return False
+            store.add_page(new_news, news_url, shard['start_page'], page + 1)
+            ingested += len(new_news)
+            matched += sum(1 for news in new_news if self.matcher.search(f"{news.title} {news.content or ''}"))
+            self.metrics.inc('gcs_monitor_stage_items_total', len(new_news), stage='backfill')
+            
+            page += 1
+            if (page - shard['start_page']) % 20 == 0:
+                self.logger.info(f"{label} 進度: 第 {page} 頁，新增 {ingested} 篇")
+            time.sleep(self.config.get('page_delay', 1))
+        
+        store.finish_shard(news_url, shard['start_page'])
+        self.logger.info(f"{label} 完成，新增 {ingested} 篇")
+        return ingested, matched
+    
+    """影響匹配結果的配置（訂閱關鍵詞、來源篩選、時間窗口）的摘要，變更後須完整處理一輪"""
+    def _listing_config_hash(self) -> str:
+        profiles = [(profile['name'], profile.get('keywords', []), profile.get('sources')) for profile in self._get_profiles()]
+        config = json.dumps([profiles, self.config.get('days_to_check', 1)], ensure_ascii=False, sort_keys=True)
+        return hashlib.blake2b(config.encode('utf-8'), digest_size=8).hexdigest()
+    
+    """快速檢查：只抓取各來源的列表首頁並與上次完整處理時的指紋比較，全部未變化時返回 True；已抓取的首頁留給本輪翻頁複用。
+    上次記錄仍有效時帶條件請求頭，服務器返回 304 即視爲未變化；相關配置已變更，或距上次完整處理超過
+    listing_recheck_interval 秒（以便發現只改了內文的新聞）時直接抓取首頁並完整處理"""
+    def _listing_unchanged(self) -> bool:
+        self._prefetched_pages = {}
+        recheck_interval = self.config.get('listing_recheck_interval', 3600)
+        config_hash = self._listing_config_hash()
+        unchanged = True
+        for source in self._get_sources():
+            news_url = source['news_url']
+            previous = self.checkpoint.listing(news_url) or {}
+            valid = (previous.get('config') == config_hash
+                     and not (recheck_interval and time.time() - previous['checked_at'] >= recheck_interval))
+            headers = {}
+            if valid and previous.get('etag'):
+                headers['If-None-Match'] = previous['etag']
+            if valid and previous.get('last_modified'):
+                headers['If-Modified-Since'] = previous['last_modified']
+            
+            try:
+                with self.metrics.time('fetch_page'):
+                    response = self._request(news_url, 'listing', headers)
+                    if response.status_code != 304:
+                        response.raise_for_status()
+            except requests.RequestException as e:
+                self.logger.warning(f"{self._source_label(source)}快速檢查列表首頁失敗: {e}")
+                return False
+            
+            if response.status_code == 304:
+                result = 'not_modified'
+                fingerprint = previous['fingerprint']
+            else:
+                response.encoding = 'utf-8'
+                news_list = self._parse_listing(response.text, news_url)
+                self.metrics.inc('gcs_monitor_stage_items_total', len(news_list), stage='fetch_page')
+                self._prefetched_pages[news_url] = news_list
+                fingerprint = listing_fingerprint(news_list)
+                if not valid:
+                    result = 'expired' if previous else 'changed'
+                else:
+                    result = 'unchanged' if fingerprint == previous.get('fingerprint') else 'changed'
+            self.metrics.inc('gcs_monitor_listing_checks_total', result=result)
+            
+            self.checkpoint.observe_listing(news_url, {
+                'fingerprint': fingerprint,
+                'config': config_hash,
+                'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified'),
+                'checked_at': time.time()
+            })
+            unchanged = unchanged and result in ('unchanged', 'not_modified')
+        return unchanged
+    
+    """列表首頁未變化時的快速路徑：不抓取內文、不匹配，只投遞發件箱中上次未發出的郵件及已到期的摘要"""
+    def _finish_unchanged(self, profiles: List[Dict]):
+        self.logger.info("列表首頁自上次處理後未變化，本輪跳過抓取")
+        self._prefetched_pages = {}
+        self.checkpoint.discard()
+        self._queue_due_digests(profiles)
+        if self.outbox.entries:
+            self._pending_keys = self.outbox.pending_keys() | self.digest.pending_keys()
+            self.flush_outbox(wait=False)
+        self.logger.info("=" * 80)
+    
+    """保存抓取檢查點"""
+    def _commit_checkpoint(self):
+        try:
+            self.checkpoint.commit()
         except Exception as e:
-            self.logger.error(f"郵件發送失敗: {e}")
-            return False
+            self.logger.error(f"保存抓取檢查點失敗: {e}")
+    
+    """運行監控；記錄本輪耗時，write_summary 時把本輪指標寫入 JSON 摘要文件。
+    wait_notifications 時（單次運行）等待後台投遞結束再返回，常駐模式下投遞跨輪次在後台繼續"""
+    def run(self, test_mode: bool = False, write_summary: bool = True, wait_notifications: bool = True):
+        started_at = datetime.now()
+        # 上一輪解析進程池異常時，本輪重新嘗試
+        self._parse_pool_failed = False
+        result = 'error'
+        try:
+            with self.metrics.time('run'):
+                self._run(test_mode)
+            result = 'ok'
+        finally:
+            if wait_notifications:
+                self.finish_notifications()
+            self.metrics.inc('gcs_monitor_runs_total', result=result)
+            self.metrics.set('gcs_monitor_last_run_timestamp_seconds', time.time())
+            self._record_transport_stats()
+            if write_summary:
+                self._write_metrics_summary(started_at, test_mode)
+    
+    """記錄連接複用統計（累計），日誌中給出每個客戶端的請求數及新建連接數"""
+    def _record_transport_stats(self):
+        for client, counts in self.transport.record_metrics().items():
+            self.logger.debug(f"HTTP 連接複用 [{client}]: {counts['requests']} 個請求 / {counts['connections']} 個新建連接"
+                              f"（複用率 {counts['reuse_ratio']:.0%}）")
+    
+    """寫出本次運行的指標摘要"""
+    def _write_metrics_summary(self, started_at: datetime, test_mode: bool):
+        summary_file = self.config.get('metrics_summary_file', 'metrics_summary.json')
+        if not summary_file:
+            return
+        finished_at = datetime.now()
+        summary = {
+            'started_at': started_at.isoformat(),
+            'finished_at': finished_at.isoformat(),
+            'duration_seconds': round((finished_at - started_at).total_seconds(), 3),
+            'test_mode': test_mode,
+            'engine': self.engine,
+            'parser_backend': self.parser_backend,
+            'crawl_mode': self.crawl_mode
+        }
+        summary.update(self.metrics.summary())
+        summary['transport'] = self.transport.stats()
+        summary['plan'] = self._plan_log
+        try:
+            with open(summary_file, 'w', encoding='utf-8') as f:
+                json.dump(summary, f, ensure_ascii=False, indent=2)
+            self.logger.info(f"運行指標已寫入 {summary_file}")
+        except Exception as e:
+            self.logger.error(f"寫入運行指標摘要失敗: {e}")
     
-    """運行監控"""
-    def run(self, test_mode: bool = False):
+    def _run(self, test_mode: bool = False):
         self.logger.info("=" * 80)
         self.logger.info("澳門新聞局新聞監控系統 開始運行")
         self.logger.info("=" * 80)
         
-        # 1. 抓取多頁新聞列表
-        news_list = self.fetch_all_pages()
-        if not news_list:
-            self.logger.warning("未能獲取新聞列表")
+        profiles = self._get_profiles()
+        self._plan_log = []
+        if not test_mode:
+            self._begin_notify_round()
+        if not test_mode and not self._full_crawl and self.config.get('listing_fast_path', True) and self._listing_unchanged():
+            self._finish_unchanged(profiles)
             return
         
-        # 2. 抓取新聞內文（如果配置啓用）
-        if self.config.get('check_content', True):
-            news_list = self.fetch_contents_concurrent(news_list)
+        self.build_matcher()
+        self._pending_keys = self.outbox.pending_keys() | self.digest.pending_keys()
+        source_urls = {source['name']: source['news_url'] for source in self._get_sources()}
+        if self.crawl_mode == 'incremental':
+            for name, news_url in source_urls.items():
+                if not self.checkpoint.has(news_url):
+                    self.logger.info(f"{self._source_label({'name': name})}尚無抓取檢查點，本輪完整抓取")
+        
+        # 流水線：列表頁 → 內文 → 關鍵詞匹配，每條新聞完成後立即判斷，匹配結果即時產出
+        # 每條新聞只抓取、掃描一次，再分發給命中的各個訂閱
+        # 默認每條匹配立即寫入發件箱並在後台投遞；alert_immediately 爲 false 時整輪結束後按訂閱合併發送
+        alert_immediately = self.config.get('alert_immediately', True) and not test_mode
+        queued = True
+        news_count = 0
+        failed_count = 0
+        matches = {profile['name']: [] for profile in profiles}
+        
+        fetched = []
+        
+        for news in self.iter_news():
+            news_count += 1
+            fetched.append(news)
+            failed_count += bool(news.content_failed)
+            self.checkpoint.observe(source_urls.get(news.source, ''), news)
+            for profile in self.match_profiles(news):
+                matches[profile['name']].append(news)
+                if alert_immediately and not self._digest_interval(profile):
+                    queued = self.notify([news], profile) and queued
+        
+        self._index_articles(fetched)
+        self._prefetched_pages = {}
+        
+        if not news_count:
+            self.logger.warning("未能獲取新聞列表")
+            if not test_mode:
+                self._queue_due_digests(profiles)
+            if not test_mode and self.outbox.entries:
+                self.flush_outbox(wait=False)
+            return
         
-        # 3. 過濾相關新聞
-        filtered_news = self.filter_news(news_list)
+        filtered_count = len({news.url for news_list in matches.values() for news in news_list})
         
         # 測試模式：只顯示結果
         if test_mode:
             self.logger.info(f"\n{'='*80}")
             self.logger.info("測試模式 - 抓取結果:")
-            self.logger.info(f"總新聞數: {len(news_list)}")
-            self.logger.info(f"相關新聞數: {len(filtered_news)}")
-            if filtered_news:
-                self.logger.info("\n相關新聞列表:")
-                for i, news in enumerate(filtered_news, 1):
-                    self.logger.info(f"{i}. {news['title']}")
-                    self.logger.info(f"   鏈接: {news['url']}")
-                    if news.get('content'):
-                        preview = news['content'][:100]
-                        self.logger.info(f"   預覽: {preview}...")
-                    self.logger.info("")
+            self.logger.info(f"總新聞數: {news_count}")
+            self.logger.info(f"相關新聞數: {filtered_count}")
+            if filtered_count:
+                for profile in profiles:
+                    filtered_news = matches[profile['name']]
+                    if not filtered_news:
+                        continue
+                    label = '' if profile['name'] == 'default' else f" [{profile['name']}]"
+                    self.logger.info(f"\n相關新聞列表{label}:")
+                    for i, news in enumerate(filtered_news, 1):
+                        self.logger.info(f"{i}. {news.title}")
+                        self.logger.info(f"   鏈接: {news.url}")
+                        self.logger.info(f"   關鍵詞: {', '.join(news.matched_keywords or {})}")
+                        if news.content:
+                            preview = news.content[:100]
+                            self.logger.info(f"   預覽: {preview}...")
+                        self.logger.info("")
             else:
                 self.logger.info("未發現包含關鍵詞的新聞")
             self.logger.info(f"{'='*80}\n")
-            self.logger.info("（測試模式不會發送郵件）")
+            self.logger.info("（測試模式不會發送郵件，也不會更新抓取檢查點）")
+            self.checkpoint.discard()
             return
         
-        # 正式模式：發送郵件
-        if filtered_news:
-            self.send_email(filtered_news)
-            self.logger.info(f"處理完成，共發送 {len(filtered_news)} 條新聞")
+        # 正式模式：發送通知（即時推送模式下已在匹配時逐條寫入發件箱並在後台投遞，摘要模式的訂閱先加入摘要）
+        # 所有訂閱的通知按渠道寫入發件箱，再連同上次未發出的條目按渠道併發投遞（郵件共用同一個 SMTP 連接）
+        for profile in profiles:
+            if not matches[profile['name']]:
+                continue
+            if alert_immediately and not self._digest_interval(profile):
+                continue
+            queued = self._queue_matches(matches[profile['name']], profile) and queued
+        queued = self._queue_due_digests(profiles) and queued
+        
+        # 投遞在後台進行，本輪不等待最慢的渠道（SMTP 重連退避等）；常駐模式下跨輪次繼續，進程退出前纔等待全部結束
+        if self.outbox.entries:
+            self.flush_outbox(wait=False)
+        
+        if filtered_count:
+            self.logger.info(f"處理完成，共發現 {filtered_count} 條新聞")
         else:
             self.logger.info("未發現新的相關新聞")
+        
+        # 通知已寫入發件箱（或摘要）即推進檢查點，無需等待投遞；寫入失敗時不推進，下輪重新翻頁處理
+        # 有內文抓取失敗時同樣不推進，下輪重新抓取這些新聞的內文（已發送的不會重複發送）
+        if failed_count:
+            self.logger.warning(f"{failed_count} 條新聞內文抓取失敗，本輪只按標題匹配，下輪將重新檢查")
+        if queued and not failed_count:
+            self._commit_checkpoint()
+        else:
+            self.checkpoint.discard()
             
         self.logger.info("=" * 80)
 
+    """常駐模式：保持同一個監控器實例按間隔輪詢，沿用連接池、去重存儲及緩存，配置文件變更時熱加載"""
+    def run_daemon(self, test_mode: bool = False):
+        self.logger.info("常駐模式啓動")
+        self._start_metrics_server()
+        
+        try:
+            while True:
+                self.reload_config_if_changed()
+                
+                try:
+                    self.run(test_mode=test_mode, write_summary=False, wait_notifications=False)
+                except Exception:
+                    self.logger.exception("本輪監控運行出錯，將在下一輪重試")
+                
+                interval = self.config.get('poll_interval', 300)
+                jitter = self.config.get('poll_jitter', 30)
+                delay = max(1.0, interval + random.uniform(-jitter, jitter))
+                self.logger.info(f"下一輪將在 {delay:.0f} 秒後運行")
+                time.sleep(delay)
+        finally:
+            self.finish_notifications()
+    
+    """常駐模式下啓動 Prometheus 指標端點（metrics_port 爲 0 時不啓動）"""
+    def _start_metrics_server(self):
+        port = self.config.get('metrics_port', 9108)
+        if not port:
+            return None
+        host = self.config.get('metrics_host', '127.0.0.1')
+        try:
+            server = self.metrics.serve(host, port)
+        except OSError as e:
+            self.logger.error(f"啓動指標端點失敗: {e}")
+            return None
+        self.logger.info(f"指標端點已啓動: http://{host}:{port}/metrics")
+        return server
+
+
+"""輸出 --query 的結果"""
+def print_query_results(monitor: MacauNewsMonitorEmail, terms: List[str], days: float, limit: Optional[int]):
+    start = time.perf_counter()
+    results = monitor.query_articles(terms, days, limit)
+    elapsed = (time.perf_counter() - start) * 1000
+    
+    shown_terms = ', '.join(terms) if terms else '配置的關鍵詞'
+    window = f"最近 {days:g} 天" if days else "全部"
+    print(f"查詢 {shown_terms}（{window}）: {len(results)} 篇，耗時 {elapsed:.1f} ms")
+    for i, news in enumerate(results, 1):
+        publish_time = news.publish_time.strftime('%Y-%m-%d %H:%M') if news.publish_time else '----'
+        print(f"\n{i}. {publish_time}  {news.title}")
+        print(f"   鏈接: {news.url}")
+        print(f"   關鍵詞: {', '.join(news.matched_keywords)}")
+        text = f"{news.title} {news.content}"
+        if news.content:
+            # 摘要取內文中第一個命中位置附近的文字（只在標題命中時取內文開頭）
+            offsets = [offset for hits in news.matched_keywords.values() for offset in hits if offset > len(news.title)]
+            first = min(offsets) if offsets else len(news.title) + 1
+            print(f"   摘要: ...{text[max(len(news.title) + 1, first - 40):first + 80]}...")
+
 
 def main():
     parser = argparse.ArgumentParser(description='澳門新聞局新聞監控系統')
     parser.add_argument('--test', action='store_true', help='測試模式，只顯示結果不發送郵件')
     parser.add_argument('--config', default='config_email.json', help='配置文件路徑')
+    parser.add_argument('--daemon', action='store_true', help='常駐模式，按 poll_interval 間隔持續輪詢')
+    parser.add_argument('--full', action='store_true', help='完整抓取時間窗口內的所有頁面（忽略增量檢查點）')
+    parser.add_argument('--engine', choices=['threads', 'async'], help='抓取引擎（默認讀取配置 engine，未配置時爲 threads）')
+    parser.add_argument('--backfill', action='store_true', help='歷史回填：分片並行抓取新聞歸檔並寫入本地文章庫，可中斷續跑')
+    parser.add_argument('--backfill-pages', type=int, help='回填的最大頁數（默認讀取配置 backfill_max_pages）')
+    parser.add_argument('--backfill-shards', type=int, help='回填的並行分片數（默認讀取配置 backfill_shards）')
+    parser.add_argument('--backfill-restart', action='store_true', help='忽略回填斷點，重新規劃分片')
+    parser.add_argument('--query', nargs='*', metavar='TERM', help='在本地文章庫中查詢提及檢索詞的文章（不帶檢索詞時使用配置的關鍵詞）')
+    parser.add_argument('--days', type=float, default=30, help='--query / --alert 的時間範圍（天，0 爲不限）')
+    parser.add_argument('--limit', type=int, help='--query 最多顯示的文章數')
+    parser.add_argument('--alert', action='store_true', help='把本地文章庫中命中關鍵詞但尚未發送的文章發送給各訂閱')
     
     args = parser.parse_args()
     
     try:
-        monitor = MacauNewsMonitorEmail(config_file=args.config)
-        monitor.run(test_mode=args.test)
+        monitor = MacauNewsMonitorEmail(config_file=args.config, engine=args.engine, full_crawl=args.full)
+        if args.query is not None:
+            print_query_results(monitor, args.query, args.days, args.limit)
+        elif args.alert:
+            monitor.alert_from_index(args.days)
+        elif args.backfill:
+            monitor.backfill(args.backfill_pages, args.backfill_shards, restart=args.backfill_restart)
+        elif args.daemon:
+            monitor.run_daemon(test_mode=args.test)
+        else:
+            monitor.run(test_mode=args.test)
     except KeyboardInterrupt:
         print("\n程序已中斷")
     except Exception as e: